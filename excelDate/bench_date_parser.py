@@ -0,0 +1,106 @@
+"""
+日期解析性能基准测试
+
+用法：
+    python bench_date_parser.py [--cells 500000] [--date-ratio 0.1]
+
+在模拟真实工作簿的单元格混合数据（大部分为非日期）上，
+对比旧版五次正则循环与当前 parse_chinese_date 的每秒调用次数。
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+
+from dify_date_parser import parse_chinese_date
+
+
+def legacy_parse_chinese_date(date_str):
+    """旧版实现：依次尝试五个正则，作为对照基线"""
+    if not isinstance(date_str, str):
+        return None
+
+    date_str = date_str.strip()
+    patterns = [
+        (r'^(\d{4})/(\d{1,2})/(\d{1,2})\s+(\d{1,2}):(\d{1,2}):(\d{1,2})$'),
+        (r'^(\d{4})-(\d{1,2})-(\d{1,2})\s+(\d{1,2}):(\d{1,2}):(\d{1,2})$'),
+        (r'^(\d{4})年(\d{1,2})月(\d{1,2})日$'),
+        (r'^(\d{4})/(\d{1,2})/(\d{1,2})$'),
+        (r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+    ]
+
+    for pattern in patterns:
+        match = re.match(pattern, date_str)
+        if match:
+            groups = match.groups()
+            hour = minute = second = 0
+            if len(groups) > 3:
+                hour, minute, second = int(groups[3]), int(groups[4]), int(groups[5])
+            try:
+                return datetime(int(groups[0]), int(groups[1]), int(groups[2]), hour, minute, second)
+            except ValueError:
+                continue
+    return None
+
+
+def generate_cells(count, date_ratio, seed=42):
+    """生成单元格样本：日期、金额、编号、姓名、备注等混合"""
+    rng = random.Random(seed)
+    names = ['张三', '李四', '王五', '赵六', '客户A', '供应商B', '北京分公司', '上海仓库']
+    remarks = ['已付款', '待审核', '退货', '备注：加急处理', 'N/A', '合计', '小计', '是', '否']
+
+    def date_cell():
+        y, m, d = rng.randint(2000, 2030), rng.randint(1, 12), rng.randint(1, 28)
+        h, mi, s = rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)
+        return rng.choice([
+            f'{y}/{m}/{d} {h}:{mi}:{s}',
+            f'{y}-{m:02d}-{d:02d} {h:02d}:{mi:02d}:{s:02d}',
+            f'{y}年{m}月{d}日',
+            f'{y}/{m}/{d}',
+            f'{y}-{m:02d}-{d:02d}',
+            f'{y}.{m}.{d}',
+            f'{y}年{m}月{d}日 {h}时{mi}分',
+            f'{y}-{m:02d}-{d:02d} {h:02d}:{mi:02d}',
+        ])
+
+    def other_cell():
+        return rng.choice([
+            lambda: str(rng.randint(1, 10 ** 6)),
+            lambda: f'{rng.uniform(0, 100000):.2f}',
+            lambda: f'SO{rng.randint(10 ** 9, 10 ** 10)}',
+            lambda: f'{rng.randint(2000, 2030)}{rng.randint(100000, 999999)}',
+            lambda: rng.choice(names),
+            lambda: rng.choice(remarks),
+        ])()
+
+    return [date_cell() if rng.random() < date_ratio else other_cell() for _ in range(count)]
+
+
+def bench(func, cells):
+    """返回 (每秒调用次数, 识别到的日期数)"""
+    start = time.perf_counter()
+    hits = 0
+    for cell in cells:
+        if func(cell) is not None:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    return len(cells) / elapsed, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='parse_chinese_date 性能基准测试')
+    parser.add_argument('--cells', type=int, default=500000, help='单元格数量')
+    parser.add_argument('--date-ratio', type=float, default=0.1, help='日期单元格占比')
+    args = parser.parse_args()
+
+    cells = generate_cells(args.cells, args.date_ratio)
+    print(f"[INFO] 单元格数量: {len(cells)}，日期占比: {args.date_ratio:.0%}")
+
+    for label, func in (('旧版五次正则', legacy_parse_chinese_date), ('单次编译正则', parse_chinese_date)):
+        rate, hits = bench(func, cells)
+        print(f"  {label}: {rate:,.0f} 次/秒，识别日期 {hits} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+文本文件日期处理吞吐量基准测试
+
+用法：
+    python bench_text_stream.py [--size-mb 200]
+
+生成混合分隔符的 CSV/TSV 文本，对比旧版按行 split/join 的处理方式
+与当前流式处理 process_text_stream 的吞吐量 (MB/s) 和峰值内存。
+"""
+import argparse
+import io
+import random
+import re
+import time
+import tracemalloc
+
+from dify_date_parser import format_chinese_date, process_text_stream
+
+
+def legacy_process_text_file_memory(content):
+    """旧版实现：整体解码、按行切分再拼接，作为对照基线"""
+    processed_count = 0
+    lines = content.split('\n')
+
+    for i, line in enumerate(lines):
+        parts = re.split(r'[\t,;|]', line)
+        line_modified = False
+
+        for j, part in enumerate(parts):
+            formatted_date = format_chinese_date(part.strip())
+            if formatted_date:
+                parts[j] = formatted_date
+                processed_count += 1
+                line_modified = True
+
+        if line_modified:
+            for delimiter in ('\t', ',', ';', '|'):
+                if delimiter in line:
+                    lines[i] = delimiter.join(parts)
+                    break
+            else:
+                lines[i] = ' '.join(parts)
+
+    return '\n'.join(lines), processed_count
+
+
+def generate_text(size_mb, seed=42):
+    """生成约 size_mb 大小的文本，每行约 1/3 字段为日期"""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    target = size_mb * 1024 * 1024
+    while total < target:
+        delimiter = rng.choice([',', '\t', ';', '|'])
+        fields = [
+            f'SO{rng.randint(10 ** 9, 10 ** 10)}',
+            f'2025/{rng.randint(1, 12)}/{rng.randint(1, 28)} {rng.randint(0, 23)}:{rng.randint(0, 59)}',
+            f'{rng.uniform(0, 10000):.2f}',
+            rng.choice(['张三', '李四', '北京分公司', '备注：加急']),
+            f'{rng.randint(2000, 2030)}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日',
+            str(rng.randint(1, 10 ** 6)),
+        ]
+        line = delimiter.join(fields) + '\r\n'
+        lines.append(line)
+        total += len(line.encode('utf-8'))
+    return ''.join(lines).encode('utf-8')
+
+
+def run_legacy(data):
+    content, count = legacy_process_text_file_memory(data.decode('utf-8'))
+    return len(content.encode('utf-8')), count
+
+
+def run_stream(data):
+    output = io.BytesIO()
+    count = process_text_stream(io.BytesIO(data), output)
+    return len(output.getvalue()), count
+
+
+def bench(label, func, data):
+    """打印吞吐量，以及执行期间新增的峰值内存（不含输入数据本身，单独测量以免影响计时）"""
+    start = time.perf_counter()
+    _, count = func(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size_mb = len(data) / 1024 / 1024
+    print(f"  {label}: {size_mb / elapsed:.1f} MB/s，峰值内存 {peak / 1024 / 1024:.0f} MB，处理日期 {count} 个")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='process_text_stream 吞吐量基准测试')
+    parser.add_argument('--size-mb', type=int, default=200, help='生成的文本大小（MB）')
+    args = parser.parse_args()
+
+    data = generate_text(args.size_mb)
+    print(f"[INFO] 文本大小: {len(data) / 1024 / 1024:.1f} MB")
+
+    bench('旧版按行处理', run_legacy, data)
+    bench('流式处理', run_stream, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+xlsx 处理内存基准测试
+
+用法：
+    python bench_xlsx_memory.py [--rows 1000000] [--mode both|tree|streaming|spooled]
+
+生成一个包含百万行工作表的 xlsx，分别在独立子进程中以元素树模式和流式模式
+运行 process_xlsx_content_memory，报告耗时和进程峰值内存 (RSS)。
+spooled 模式通过 main 以 path 输入（内存映射）、流式改写、输出先写入
+SpooledTemporaryFile 的方式处理，对应限制内存的配置。
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+from dify_date_parser import main as process_files, process_xlsx_content_memory
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/></Relationships>'
+)
+
+
+def generate_workbook(path, rows):
+    """生成单工作表 xlsx：编号、金额、内联字符串日期、备注四列"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _WORKBOOK)
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            batch = []
+            for r in range(1, rows + 1):
+                batch.append(
+                    f'<row r="{r}"><c r="A{r}"><v>{r}</v></c><c r="B{r}"><v>{r * 1.5}</v></c>'
+                    f'<c r="C{r}" t="inlineStr"><is><t>2025/{r % 12 + 1}/{r % 28 + 1}</t></is></c>'
+                    f'<c r="D{r}" t="inlineStr"><is><t>备注{r % 100}</t></is></c></row>'
+                )
+                if len(batch) >= 10000:
+                    sheet.write(''.join(batch).encode('utf-8'))
+                    batch = []
+            sheet.write(''.join(batch).encode('utf-8'))
+            sheet.write(b'</sheetData></worksheet>')
+
+
+def run_spooled(path, spool_threshold_mb):
+    """path 输入 + 流式改写 + 溢出到磁盘的输出，打印耗时和 main 报告的峰值内存"""
+    start = time.perf_counter()
+    result = process_files([{'name': os.path.basename(path), 'path': path}], streaming=True,
+                           spool_threshold_mb=spool_threshold_mb)
+    elapsed = time.perf_counter() - start
+    entry = result['result'][0]
+    print(f"  spooled: 耗时 {elapsed:.2f}s，峰值内存 {result['peak_rss_mb']['self']:,.0f} MB，"
+          f"处理日期 {entry['processed_count']} 个，输出 {entry['size'] / 1024 / 1024:.1f} MB")
+
+
+def run_mode(path, mode, spool_threshold_mb=64):
+    """在当前进程中运行一次处理，打印耗时和峰值内存"""
+    if mode == 'spooled':
+        run_spooled(path, spool_threshold_mb)
+        return
+    with open(path, 'rb') as f:
+        file_data = f.read()
+    start = time.perf_counter()
+    output, count = process_xlsx_content_memory(file_data, streaming=(mode == 'streaming'))
+    elapsed = time.perf_counter() - start
+    # Linux 下 ru_maxrss 单位为 KB
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"  {mode}: 耗时 {elapsed:.2f}s，峰值内存 {peak_mb:,.0f} MB，处理日期 {count} 个，输出 {len(output) / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='xlsx 元素树模式与流式模式内存对比')
+    parser.add_argument('--rows', type=int, default=1000000, help='生成的行数')
+    parser.add_argument('--mode', choices=('both', 'tree', 'streaming', 'spooled'), default='both')
+    parser.add_argument('--spool-mb', type=int, default=64, help='spooled 模式输出转存到磁盘的阈值（MB）')
+    parser.add_argument('--input', help='已生成的 xlsx 路径（内部使用）')
+    args = parser.parse_args()
+
+    if args.input:
+        run_mode(args.input, args.mode, args.spool_mb)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'bench.xlsx')
+        generate_workbook(path, args.rows)
+        print(f"[INFO] 已生成 {args.rows} 行工作表，文件大小 {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        modes = ('tree', 'streaming') if args.mode == 'both' else (args.mode,)
+        for mode in modes:
+            # 每种模式使用独立子进程，避免峰值内存互相影响
+            subprocess.run([sys.executable, __file__, '--input', path, '--mode', mode,
+                            '--spool-mb', str(args.spool_mb)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+单个 xlsx 内工作表并行处理的扩展性基准测试
+
+用法：
+    python bench_xlsx_sheets.py [--sheets 20] [--rows 50000] [--max-workers N]
+
+生成一个包含多个工作表的 xlsx（内联字符串日期和共享字符串日期各一列），
+依次以 1 到 N 个进程运行 process_xlsx_content_memory(sheet_workers=...)，
+报告耗时和相对单进程的加速比。sheet_workers=1 时使用同样按字节改写的流式模式作为基线。
+"""
+import argparse
+import os
+import tempfile
+import time
+import zipfile
+
+from dify_date_parser import process_xlsx_content_memory
+
+_SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_RELATIONSHIP_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_SHARED_DATES = 1000
+
+
+def _content_types(sheets):
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, sheets + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        f'{overrides}</Types>'
+    )
+
+
+def _workbook(sheets):
+    entries = ''.join(f'<sheet name="Sheet{i}" sheetId="{i}" r:id="rId{i}"/>' for i in range(1, sheets + 1))
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<workbook xmlns="{_SPREADSHEET_NS}" xmlns:r="{_RELATIONSHIP_NS}"><sheets>{entries}</sheets></workbook>'
+    )
+
+
+def _workbook_rels(sheets):
+    entries = ''.join(
+        f'<Relationship Id="rId{i}" Type="{_RELATIONSHIP_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, sheets + 1)
+    )
+    shared = (f'<Relationship Id="rId{sheets + 1}" Type="{_RELATIONSHIP_NS}/sharedStrings" '
+              'Target="sharedStrings.xml"/>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<Relationships xmlns="{_PACKAGE_RELS_NS}">{entries}{shared}</Relationships>'
+    )
+
+
+def generate_workbook(path, sheets, rows):
+    """生成多工作表 xlsx：编号、金额、内联字符串日期、共享字符串日期四列"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _content_types(sheets))
+        zf.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<Relationships xmlns="{_PACKAGE_RELS_NS}"><Relationship Id="rId1" '
+            f'Type="{_RELATIONSHIP_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ))
+        zf.writestr('xl/workbook.xml', _workbook(sheets))
+        zf.writestr('xl/_rels/workbook.xml.rels', _workbook_rels(sheets))
+        shared = ''.join(f'<si><t>2024年{i % 12 + 1}月{i % 28 + 1}日</t></si>' for i in range(_SHARED_DATES))
+        zf.writestr('xl/sharedStrings.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<sst xmlns="{_SPREADSHEET_NS}" count="{_SHARED_DATES}" uniqueCount="{_SHARED_DATES}">{shared}</sst>'
+        ))
+        for sheet_idx in range(1, sheets + 1):
+            with zf.open(f'xl/worksheets/sheet{sheet_idx}.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                )
+                batch = []
+                for r in range(1, rows + 1):
+                    batch.append(
+                        f'<row r="{r}"><c r="A{r}"><v>{r}</v></c><c r="B{r}"><v>{r * 1.5}</v></c>'
+                        f'<c r="C{r}" t="inlineStr"><is><t>2025/{r % 12 + 1}/{r % 28 + 1} {r % 24}:{r % 60}</t></is></c>'
+                        f'<c r="D{r}" t="s"><v>{r % _SHARED_DATES}</v></c></row>'
+                    )
+                    if len(batch) >= 10000:
+                        sheet.write(''.join(batch).encode('utf-8'))
+                        batch = []
+                sheet.write(''.join(batch).encode('utf-8'))
+                sheet.write(b'</sheetData></worksheet>')
+
+
+def run(file_data, workers):
+    """运行一次处理，返回 (耗时, 处理数量)"""
+    start = time.perf_counter()
+    _, count = process_xlsx_content_memory(file_data, streaming=True, sheet_workers=workers)
+    return time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='工作表级并行处理扩展性测试')
+    parser.add_argument('--sheets', type=int, default=20, help='工作表数量')
+    parser.add_argument('--rows', type=int, default=50000, help='每个工作表的行数')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='最大进程数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'bench.xlsx')
+        generate_workbook(path, args.sheets, args.rows)
+        with open(path, 'rb') as f:
+            file_data = f.read()
+    print(f"[INFO] {args.sheets} 个工作表 × {args.rows} 行，文件大小 {len(file_data) / 1024 / 1024:.1f} MB，"
+          f"CPU 核数 {os.cpu_count()}")
+
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        elapsed, count = run(file_data, workers)
+        baseline = baseline or elapsed
+        print(f"  {workers} 进程: 耗时 {elapsed:.2f}s，加速比 {baseline / elapsed:.2f}x，处理日期 {count} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,67 @@
 import os
 import re
 import copy
+import glob
+import json
+import hashlib
+import time
+import signal
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from functools import lru_cache
 from openpyxl import load_workbook
 from openpyxl.styles import Font, Fill, Border, Alignment
 
+try:
+    import resource
+except ImportError:  # Windows 下没有 resource 模块，不支持内存上限
+    resource = None
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # 未安装 pandas 时，表格模式退回逐值解析
+    np = pd = None
+
+
+# 单次匹配的日期识别正则，覆盖全部支持格式
+_DATE_PATTERN = re.compile(
+    r'(\d{4})'
+    r'(?:([-/.])(\d{1,2})\2(\d{1,2})'                        # 2025/9/11, 2025-09-11, 2025.9.11
+    r'|年(\d{1,2})月(\d{1,2})日)'                             # 2025年9月11日
+    r'(?:\s+(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?'               # 8:11 或 8:11:11
+    r'|\s*(\d{1,2})[时点](\d{1,2})分(?:(\d{1,2})秒)?)?'        # 8时11分 或 8时11分11秒
+)
+
+# 第5个字符必须是日期分隔符，用于快速排除非日期单元格
+_DATE_SEPARATORS = frozenset('-/.年')
+
+# 日期解析缓存的最大条目数，同一批次内的所有工作表和文件共享
+DATE_CACHE_SIZE = 65536
+
+# 解析规则版本号，修改日期识别或输出格式时需递增，使增量清单中的记录失效
+PARSER_VERSION = '2'
+
+# 表格模式：每列取样的行数，以及样本中日期占比达到多少视为日期列
+TABULAR_SAMPLE_ROWS = 200
+DATE_COLUMN_RATIO = 0.6
+
+# 整列批量匹配用的锚定正则，分组与 _DATE_PATTERN 一致
+_DATE_COLUMN_PATTERN = r'^\s*(?:' + _DATE_PATTERN.pattern + r')\s*\Z'
+
+
+def _could_be_date(date_str):
+    """
+    廉价检查 date_str（已去除首尾空白）是否可能是日期。
+
+    最短的日期 "2025/9/1" 也有8个字符，且以4位年份开头、紧跟分隔符。
+    首字符用 isdigit 判断，全角数字等日期正则也接受的字符不会被提前排除。
+    """
+    return len(date_str) >= 8 and date_str[4] in _DATE_SEPARATORS and date_str[0].isdigit()
+
 
 def parse_chinese_date(date_str):
     """
@@ -13,9 +70,15 @@ def parse_chinese_date(date_str):
     支持的格式包括：
     - 2025/9/11 8:11:11
     - 2025-09-11 08:11:22
+    - 2025.9.11 08:11
     - 2025年9月11日
+    - 2025年9月11日 8时11分
     - 2025/9/11
     - 2025-09-11
+    - 2025.9.11
+
+    时间部分的秒可以省略。先用首字符和长度做廉价检查，
+    绝大多数非日期单元格在进入正则之前就被排除。
 
     :param date_str: 输入的日期字符串
     :return: datetime.datetime 或 None (如果无法匹配)
@@ -24,70 +87,215 @@ def parse_chinese_date(date_str):
         return None
 
     date_str = date_str.strip()
+    if not _could_be_date(date_str):
+        return None
 
-    # 定义多种日期格式的正则表达式
-    patterns = [
-        # 格式: 2025/9/11 8:11:11
-        (r'^(\d{4})/(\d{1,2})/(\d{1,2})\s+(\d{1,2}):(\d{1,2}):(\d{1,2})$'),
-        # 格式: 2025-09-11 08:11:22
-        (r'^(\d{4})-(\d{1,2})-(\d{1,2})\s+(\d{1,2}):(\d{1,2}):(\d{1,2})$'),
-        # 格式: 2025年9月11日
-        (r'^(\d{4})年(\d{1,2})月(\d{1,2})日$'),
-        # 格式: 2025/9/11
-        (r'^(\d{4})/(\d{1,2})/(\d{1,2})$'),
-        # 格式: 2025-09-11
-        (r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
-    ]
-
-    # 尝试每种格式
-    for pattern in patterns:
-        match = re.match(pattern, date_str)
-        if match:
-            try:
-                # 提取年月日时分秒
-                groups = match.groups()
-                year = int(groups[0])
-
-                if '年' in date_str:
-                    # 中文格式: YYYY年MM月DD日
-                    month = int(groups[1])
-                    day = int(groups[2])
-                    hour = 0
-                    minute = 0
-                    second = 0
-                    if len(groups) > 3:
-                        hour = int(groups[3])
-                        minute = int(groups[4])
-                        second = int(groups[5])
-                elif '/' in date_str or '-' in date_str:
-                    # 数字格式: YYYY/MM/DD[ HH:MM:SS] 或 YYYY-MM-DD[ HH:MM:SS]
-                    month = int(groups[1])
-                    day = int(groups[2])
-                    hour = 0
-                    minute = 0
-                    second = 0
-                    if len(groups) > 3:
-                        hour = int(groups[3])
-                        minute = int(groups[4])
-                        second = int(groups[5])
-                else:
-                    continue
-
-                dt = datetime(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
-                return dt
-            except ValueError:
-                continue
+    match = _DATE_PATTERN.fullmatch(date_str)
+    if not match:
+        return None
+
+    (year, _sep, month, day, cn_month, cn_day,
+     hour, minute, second, cn_hour, cn_minute, cn_second) = match.groups()
+
+    if month is None:
+        month, day = cn_month, cn_day
+    if hour is None:
+        hour, minute, second = cn_hour, cn_minute, cn_second
+
+    try:
+        return datetime(
+            year=int(year),
+            month=int(month),
+            day=int(day),
+            hour=int(hour) if hour else 0,
+            minute=int(minute) if minute else 0,
+            second=int(second) if second else 0
+        )
+    except ValueError:
+        return None
+
+
+def format_chinese_date(raw_value):
+    """
+    将日期字符串转换为 "%Y-%m-%d %H:%M:%S" 格式。
+
+    先做廉价检查，只有可能是日期的字符串才进入 _format_date_cached 的缓存，
+    大量各不相同的非日期文本不会挤掉真正重复的日期。
+
+    :param raw_value: 单元格原始字符串
+    :return: 格式化后的日期字符串，或 None (如果不是日期)
+    """
+    if not isinstance(raw_value, str):
+        return None
+    date_str = raw_value.strip()
+    if not _could_be_date(date_str):
+        return None
+    return _format_date_cached(date_str)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _format_date_cached(date_str):
+    """
+    按去除首尾空白后的字符串缓存的日期格式化。
+
+    工作簿中大量重复的单元格值（例如整列相同的时间戳）只会解析一次，
+    缓存命中情况可通过 _format_date_cached.cache_info() 查看。
+    """
+    parsed_dt = parse_chinese_date(date_str)
+    if parsed_dt is None:
+        return None
+    return parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# is_date_column、_convert_unique_values、convert_date_values 在 dify_date_parser.py 中有一份相同的副本：
+# Dify 代码节点只能是单个自包含文件，无法导入本模块。修改这里时需同步修改那一份。
+def is_date_column(sample_values, min_ratio=DATE_COLUMN_RATIO):
+    """
+    根据样本判断是否为日期列
+
+    :param sample_values: 列中前若干个单元格的值
+    :param min_ratio: 非空样本中能解析为日期的最低比例
+    :return: bool
+    """
+    values = [v for v in sample_values if isinstance(v, str) and v.strip()]
+    if not values:
+        return False
+    hits = sum(1 for v in values if format_chinese_date(v))
+    return hits / len(values) >= min_ratio
+
+
+def _convert_unique_values(values):
+    """
+    向量化转换一组互不相同的值
+
+    :param values: 去重后的值列表
+    :return: 与输入等长的列表，日期位置为格式化字符串，其余为 None
+    """
+    series = pd.Series(values, dtype=object)
+    is_text = series.map(lambda v: isinstance(v, str))
+    parts = series.where(is_text).astype(object).str.extract(_DATE_COLUMN_PATTERN)
+    matched = parts[0].notna()
+    converted = [None] * len(values)
+    if not matched.any():
+        return converted
+
+    fields = pd.DataFrame({
+        'year': parts[0],
+        'month': parts[2].fillna(parts[4]),
+        'day': parts[3].fillna(parts[5]),
+        'hour': parts[6].fillna(parts[9]).fillna('0'),
+        'minute': parts[7].fillna(parts[10]).fillna('0'),
+        'second': parts[8].fillna(parts[11]).fillna('0'),
+    })[matched].astype('int64')
+    parsed = pd.to_datetime(fields, errors='coerce')
+    formatted = parsed.dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    for index, valid in parsed.notna().items():
+        if valid:
+            converted[index] = formatted[index]
+        else:
+            # pandas 无法表示的日期（如年份超出范围）逐个解析
+            converted[index] = format_chinese_date(values[index])
+    return converted
+
+
+def convert_date_values(values):
+    """
+    整列批量转换日期，非日期值保持不变
+
+    有 pandas 时先对整列去重，再对不同的值做一次向量化的字符串提取和 to_datetime，
+    最后按编码映射回整列；重复值很多的日期列只需处理少量不同值。
+
+    :param values: 一列单元格的值
+    :return: (转换后的列表, 转换数量)
+    """
+    values = list(values)
+    if pd is None:
+        converted = [format_chinese_date(v) if isinstance(v, str) else None for v in values]
+        return [c or v for c, v in zip(converted, values)], sum(1 for c in converted if c)
+
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    converted_uniques = _convert_unique_values(list(uniques))
+    # 编码 -1（空值）映射到末尾追加的"未转换"位置
+    changed = np.array([c is not None for c in converted_uniques] + [False])
+    lookup = np.array(converted_uniques + [None], dtype=object)
+    mask = changed[codes]
+
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    result[mask] = lookup[codes[mask]]
+    return result.tolist(), int(mask.sum())
+
+
+def _set_cell_value(cell, value):
+    """更新单元格的值，保持字体、填充、边框、对齐和数字格式不变"""
+    # 保存原有样式
+    old_font = copy.copy(cell.font)
+    old_fill = copy.copy(cell.fill)
+    old_border = copy.copy(cell.border)
+    old_alignment = copy.copy(cell.alignment)
+    old_number_format = cell.number_format
+
+    # 更新单元格值
+    cell.value = value
+
+    # 恢复原有样式
+    cell.font = old_font
+    cell.fill = old_fill
+    cell.border = old_border
+    cell.alignment = old_alignment
+    cell.number_format = old_number_format
+
+
+def _convert_sheet_cells(ws):
+    """逐个单元格识别并转换日期，返回转换数量"""
+    processed_count = 0
+    for row in ws.iter_rows():
+        for cell in row:
+            if cell.value is not None and isinstance(cell.value, str):
+                # 尝试解析日期（按原始字符串缓存）
+                formatted_date = format_chinese_date(cell.value)
+                if formatted_date:
+                    _set_cell_value(cell, formatted_date)
+                    processed_count += 1
+    return processed_count
 
-    return None
+
+def _convert_sheet_columns(ws, sample_rows=TABULAR_SAMPLE_ROWS):
+    """
+    表格模式：按列处理工作表
+
+    用每列前 sample_rows 个单元格判断是否为日期列，非日期列整列跳过，
+    日期列的所有值一次性批量转换。
+
+    :return: 转换数量
+    """
+    processed_count = 0
+    for column in ws.iter_cols():
+        if not is_date_column([cell.value for cell in column[:sample_rows]]):
+            continue
+        converted, _ = convert_date_values([cell.value for cell in column])
+        for cell, new_value in zip(column, converted):
+            if new_value is not cell.value and new_value != cell.value:
+                _set_cell_value(cell, new_value)
+                processed_count += 1
+    return processed_count
 
 
-def convert_excel_dates_inplace(file_path):
+def convert_excel_dates_inplace(file_path, verbose=True, tabular=False):
     """
     直接在原文件上处理日期格式转换，保持所有样式不变
 
+    先保存到同目录的临时文件再替换原文件，处理中途失败或超时不会损坏原文件。
+
     :param file_path: Excel 文件路径
+    :param verbose: 是否打印处理进度
+    :param tabular: 表格模式，按列取样判断日期列，只批量转换日期列
+    :return: 转换的单元格数量
     """
-    print(f"[INFO] 正在处理文件: {file_path}")
+    if verbose:
+        print(f"[INFO] 正在处理文件: {file_path}")
+    processed_count = 0
 
     # 加载工作簿，保持原有格式
     wb = load_workbook(file_path)
@@ -95,64 +303,380 @@ def convert_excel_dates_inplace(file_path):
     # 遍历所有工作表
     for sheet_name in wb.sheetnames:
         ws = wb[sheet_name]
-        print(f"  处理工作表: {sheet_name}")
-
-        # 遍历所有单元格
-        for row in ws.iter_rows():
-            for cell in row:
-                if cell.value is not None and isinstance(cell.value, str):
-                    # 尝试解析日期
-                    parsed_dt = parse_chinese_date(cell.value)
-                    if parsed_dt:
-                        # 转换为标准格式
-                        formatted_date = parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
-                        # 保存原有样式
-                        old_font = copy.copy(cell.font)
-                        old_fill = copy.copy(cell.fill)
-                        old_border = copy.copy(cell.border)
-                        old_alignment = copy.copy(cell.alignment)
-                        old_number_format = cell.number_format
-
-                        # 更新单元格值
-                        cell.value = formatted_date
-
-                        # 恢复原有样式
-                        cell.font = old_font
-                        cell.fill = old_fill
-                        cell.border = old_border
-                        cell.alignment = old_alignment
-                        cell.number_format = old_number_format
+        if verbose:
+            print(f"  处理工作表: {sheet_name}")
+
+        if tabular:
+            processed_count += _convert_sheet_columns(ws)
+        else:
+            processed_count += _convert_sheet_cells(ws)
+
+    # 没有任何日期需要转换时不重新保存，保持文件原样
+    if not processed_count:
+        if verbose:
+            print(f"[INFO] 文件中没有需要转换的日期: {file_path}")
+        return 0
 
     # 保存文件
-    wb.save(file_path)
-    print(f"[SUCCESS] 文件处理完成: {file_path}")
+    fd, temp_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(os.path.abspath(file_path)))
+    os.close(fd)
+    try:
+        wb.save(temp_path)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
 
+    if verbose:
+        print(f"[SUCCESS] 文件处理完成: {file_path}")
+    return processed_count
 
-def main():
-    target_dir = input("请输入要处理的目录路径：").strip()
 
-    if not os.path.isdir(target_dir):
-        print("[ERROR] 目录不存在！请检查路径后再试。")
-        return
+def collect_xlsx_files(paths, recursive=False):
+    """
+    根据命令行参数收集待处理的 .xlsx 文件
 
-    xlsx_files = [f for f in os.listdir(target_dir) if f.endswith('.xlsx') and not f.startswith('~$')]
+    :param paths: 文件、目录或通配符模式列表
+    :param recursive: 目录是否递归查找（通配符中的 ** 也会递归匹配）
+    :return: 去重并排序后的文件路径列表
+    """
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, '**', '*.xlsx') if recursive else os.path.join(path, '*.xlsx')
+            candidates = glob.glob(pattern, recursive=recursive)
+        elif os.path.isfile(path):
+            candidates = [path]
+        else:
+            candidates = glob.glob(path, recursive=recursive)
 
-    if not xlsx_files:
-        print("[WARN] 当前目录没有找到任何 .xlsx 文件。")
-        return
+        for candidate in candidates:
+            name = os.path.basename(candidate)
+            if name.endswith('.xlsx') and not name.startswith('~$') and os.path.isfile(candidate):
+                found.add(os.path.abspath(candidate))
 
-    total_count = len(xlsx_files)
-    success_count = 0
+    return sorted(found)
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """分块计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    读取增量处理清单，不存在或损坏时返回空清单
+
+    清单结构：
+    - files: 文件路径 -> 上次记录时的 size、mtime_ns 和 sha256
+    - clean: 内容哈希 -> 确认无需处理时的解析规则版本
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get('files'), dict) and isinstance(manifest.get('clean'), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'files': {}, 'clean': {}}
+
+
+def save_manifest(manifest_path, manifest):
+    """先写临时文件再替换，避免中断时留下损坏的清单"""
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp_path, manifest_path)
+
+
+def manifest_version(tabular=False):
+    """清单中记录的规则版本：表格模式与逐单元格模式的结果可能不同，分别记录"""
+    return f"{PARSER_VERSION}-tabular" if tabular else PARSER_VERSION
+
+
+def check_manifest(manifest, file_path, version=PARSER_VERSION):
+    """
+    判断文件是否可以跳过
+
+    size 和 mtime 与记录一致时直接使用记录的哈希，否则重新计算哈希。
+    只有以相同规则版本 version 确认过的内容才会跳过。
+
+    :return: (是否可跳过, 当前内容哈希)
+    """
+    stat = os.stat(file_path)
+    entry = manifest['files'].get(file_path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        digest = entry['sha256']
+    else:
+        digest = file_sha256(file_path)
+        manifest['files'][file_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    return manifest['clean'].get(digest) == version, digest
+
+
+def record_manifest(manifest, file_path, digest, version=PARSER_VERSION):
+    """记录处理后的文件状态，下次运行时该内容视为已规范化"""
+    stat = os.stat(file_path)
+    manifest['files'][file_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    manifest['clean'][digest] = version
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("处理超时")
+
+
+def _init_worker(max_memory_mb):
+    """进程池初始化：为每个工作进程设置内存上限"""
+    if max_memory_mb and resource is not None:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def process_file_worker(file_path, timeout=None, compute_hash=False, tabular=False):
+    """
+    进程池工作函数：处理单个文件并返回可序列化的统计结果
+
+    :param file_path: Excel 文件路径
+    :param timeout: 单个文件的超时时间（秒），None 表示不限制
+    :param compute_hash: 处理成功后是否计算输出文件的哈希（用于增量清单）
+    :param tabular: 是否使用表格模式
+    :return: dict，包含耗时、转换数量、缓存命中和错误信息
+    """
+    cache_before = _format_date_cached.cache_info()
+    result = {
+        'file': file_path,
+        'size': os.path.getsize(file_path),
+        'status': 'success',
+        'cells_changed': 0,
+        'duration': 0.0,
+        'error': None
+    }
+
+    use_alarm = bool(timeout) and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(int(timeout))
+
+    start = time.perf_counter()
+    try:
+        result['cells_changed'] = convert_excel_dates_inplace(file_path, verbose=False, tabular=tabular)
+        if compute_hash:
+            result['sha256'] = file_sha256(file_path)
+    except TimeoutError:
+        result['status'] = 'timeout'
+        result['error'] = f"处理超时（超过 {timeout} 秒）"
+    except MemoryError:
+        result['status'] = 'failed'
+        result['error'] = "超出工作进程内存上限"
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
 
-    for idx, filename in enumerate(xlsx_files, start=1):
-        full_path = os.path.join(target_dir, filename)
+    result['duration'] = round(time.perf_counter() - start, 4)
+    cache_after = _format_date_cached.cache_info()
+    result['cache_hits'] = cache_after.hits - cache_before.hits
+    result['cache_misses'] = cache_after.misses - cache_before.misses
+    return result
+
+
+def _worker_failed_result(path, error):
+    """工作进程异常退出时的结果"""
+    return {
+        'file': path,
+        'size': os.path.getsize(path),
+        'status': 'failed',
+        'cells_changed': 0,
+        'duration': 0.0,
+        'error': f"工作进程异常退出: {error}",
+        'cache_hits': 0,
+        'cache_misses': 0
+    }
+
+
+def _process_file_isolated(path, timeout, compute_hash, tabular, max_memory_mb):
+    """在只有一个工作进程的独立进程池中处理文件，进程被终止时只影响这一个文件"""
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(max_memory_mb,)) as executor:
         try:
-            convert_excel_dates_inplace(full_path)
-            success_count += 1
-            print(f"[SUCCESS] 已成功处理 ({idx}/{total_count}): {filename}")
+            return executor.submit(process_file_worker, path, timeout, compute_hash, tabular).result()
         except Exception as e:
-            print(f"[FAILED] 处理失败 ({idx}/{total_count}): {filename} | 错误信息: {e}")
+            return _worker_failed_result(path, e)
+
+
+def run_batch(xlsx_files, jobs=None, timeout=None, max_memory_mb=None, manifest=None, force=False,
+              tabular=False):
+    """
+    使用进程池并行处理多个文件，单个文件的失败不影响其他文件
+
+    工作进程被强制终止（例如超出 RLIMIT_AS 内存上限）后整个进程池失效，
+    尚未完成的文件都会收到 BrokenProcessPool；这些文件随后各自在独立的进程中重新处理，
+    只有导致进程退出的文件记为失败。
+
+    :param xlsx_files: 文件路径列表
+    :param jobs: 工作进程数，默认使用全部 CPU
+    :param timeout: 单个文件的超时时间（秒）
+    :param max_memory_mb: 每个工作进程的内存上限（MB）
+    :param manifest: 增量处理清单，提供时跳过内容未变化或已规范化的文件，并就地更新
+    :param force: 忽略清单中的记录，全部重新处理
+    :param tabular: 是否使用表格模式
+    :return: 与输入顺序一致的结果列表
+    """
+    total_count = len(xlsx_files)
+    results = [None] * total_count
+    pending = []
+    version = manifest_version(tabular)
+
+    for idx, path in enumerate(xlsx_files):
+        if manifest is not None and not force:
+            skip, _ = check_manifest(manifest, path, version)
+            if skip:
+                results[idx] = {
+                    'file': path,
+                    'size': os.path.getsize(path),
+                    'status': 'skipped',
+                    'cells_changed': 0,
+                    'duration': 0.0,
+                    'error': None,
+                    'cache_hits': 0,
+                    'cache_misses': 0
+                }
+                continue
+        pending.append(idx)
+
+    skipped_count = total_count - len(pending)
+    if skipped_count:
+        print(f"[INFO] 增量清单中已规范化且未变化的文件 {skipped_count} 个，已跳过")
+    if not pending:
+        return results
+
+    done_count = 0
+
+    def finish(idx, result):
+        nonlocal done_count
+        done_count += 1
+        results[idx] = result
+        filename = os.path.basename(xlsx_files[idx])
+
+        if result['status'] == 'success' and manifest is not None:
+            record_manifest(manifest, xlsx_files[idx], result['sha256'], version)
+
+        if result['status'] == 'success':
+            print(f"[SUCCESS] 已成功处理 ({done_count}/{len(pending)}): {filename} | "
+                  f"转换 {result['cells_changed']} 个单元格，耗时 {result['duration']:.2f}s")
+        else:
+            print(f"[FAILED] 处理失败 ({done_count}/{len(pending)}): {filename} | 错误信息: {result['error']}")
+
+    broken = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(max_memory_mb,)) as executor:
+        futures = {
+            executor.submit(process_file_worker, xlsx_files[idx], timeout, manifest is not None, tabular): idx
+            for idx in pending
+        }
+
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # 进程池已失效，无法判断是哪个文件导致的，稍后逐个重新处理
+                broken.append(idx)
+                continue
+            except Exception as e:
+                result = _worker_failed_result(xlsx_files[idx], e)
+            finish(idx, result)
+
+    if broken:
+        print(f"[WARN] 工作进程异常退出，进程池已失效；{len(broken)} 个未完成的文件在独立进程中重新处理")
+        broken.sort()
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as retry_executor:
+            retries = [
+                retry_executor.submit(_process_file_isolated, xlsx_files[idx], timeout, manifest is not None,
+                                      tabular, max_memory_mb)
+                for idx in broken
+            ]
+            for idx, retry in zip(broken, retries):
+                finish(idx, retry.result())
+
+    return results
+
+
+def summarize_results(results, elapsed):
+    """汇总批处理结果，计算整体吞吐量"""
+    success_count = sum(1 for r in results if r['status'] == 'success')
+    skipped_count = sum(1 for r in results if r['status'] == 'skipped')
+    total_bytes = sum(r['size'] for r in results)
+    cells_changed = sum(r['cells_changed'] for r in results)
+    return {
+        'parser_version': PARSER_VERSION,
+        'total_files': len(results),
+        'success_count': success_count,
+        'skipped_count': skipped_count,
+        'failed_count': len(results) - success_count - skipped_count,
+        'cells_changed': cells_changed,
+        'cache_hits': sum(r['cache_hits'] for r in results),
+        'cache_misses': sum(r['cache_misses'] for r in results),
+        'elapsed': round(elapsed, 4),
+        'files_per_second': round(len(results) / elapsed, 2) if elapsed else None,
+        'cells_per_second': round(cells_changed / elapsed, 2) if elapsed else None,
+        'mb_per_second': round(total_bytes / 1024 / 1024 / elapsed, 2) if elapsed else None,
+        'files': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量将 Excel 文件中的日期统一转换为 yyyy-MM-dd HH:mm:ss 格式')
+    parser.add_argument('paths', nargs='*', help='文件、目录或通配符模式；不提供时交互式输入目录')
+    parser.add_argument('-r', '--recursive', action='store_true', help='递归查找子目录中的 .xlsx 文件')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='并行工作进程数（默认 CPU 核数）')
+    parser.add_argument('--timeout', type=int, default=None, help='单个文件的超时时间（秒）')
+    parser.add_argument('--max-memory', type=int, default=None, help='每个工作进程的内存上限（MB）')
+    parser.add_argument('--summary', default=None, help='将 JSON 格式的处理汇总写入该文件')
+    parser.add_argument('--manifest', default=None, help='增量处理清单路径（JSON），跳过未变化或已规范化的文件')
+    parser.add_argument('--force', action='store_true', help='忽略增量清单，全部重新处理')
+    parser.add_argument('--tabular', action='store_true',
+                        help='表格模式：按列取样判断日期列，只批量转换日期列（适合整列为日期的大表）')
+    args = parser.parse_args(argv)
+
+    paths = args.paths
+    if not paths:
+        target_dir = input("请输入要处理的目录路径：").strip()
+        if not os.path.isdir(target_dir):
+            print("[ERROR] 目录不存在！请检查路径后再试。")
+            return
+        paths = [target_dir]
+
+    xlsx_files = collect_xlsx_files(paths, recursive=args.recursive)
+
+    if not xlsx_files:
+        print("[WARN] 没有找到任何 .xlsx 文件。")
+        return
+
+    print(f"[INFO] 共 {len(xlsx_files)} 个文件，使用 {args.jobs} 个工作进程")
+    manifest = load_manifest(args.manifest) if args.manifest else None
+    start = time.perf_counter()
+    results = run_batch(xlsx_files, jobs=args.jobs, timeout=args.timeout, max_memory_mb=args.max_memory,
+                        manifest=manifest, force=args.force, tabular=args.tabular)
+    summary = summarize_results(results, time.perf_counter() - start)
+
+    if manifest is not None:
+        save_manifest(args.manifest, manifest)
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] 处理汇总已写入: {args.summary}")
 
+    print(f"[INFO] 成功 {summary['success_count']} 个，跳过 {summary['skipped_count']} 个，"
+          f"失败 {summary['failed_count']} 个，"
+          f"共转换 {summary['cells_changed']} 个单元格")
+    print(f"[INFO] 日期解析缓存: 命中 {summary['cache_hits']} 次，未命中 {summary['cache_misses']} 次")
+    print(f"[INFO] 总耗时 {summary['elapsed']:.2f}s，吞吐量 {summary['files_per_second']} 文件/秒，"
+          f"{summary['mb_per_second']} MB/秒")
     print("\n==日期格式化已完成==")
 
 
@@ -1,10 +1,59 @@
 import re
 import io
 import os
+import sys
+import copy
+import codecs
+import html
+import json
+import struct
+import hashlib
+import csv
+import mmap
+import shutil
+import tempfile
+import threading
+import time
+import multiprocessing
 from datetime import datetime
 import zipfile
+import zlib
 import xml.etree.ElementTree as ET
 import base64
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
+from contextlib import ExitStack
+
+try:
+    import resource
+except ImportError:  # Windows 下没有 resource 模块，不报告峰值内存
+    resource = None
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # 沙箱未安装 pandas 时，表格模式退回逐值解析
+    np = pd = None
+
+# 单次匹配的日期识别正则：2025/9/11、2025-09-11、2025.9.11、2025年9月11日，可带 8:11[:11] 或 8时11分[11秒]
+_DATE_PATTERN = re.compile(
+    r'(\d{4})'
+    r'(?:([-/.])(\d{1,2})\2(\d{1,2})|年(\d{1,2})月(\d{1,2})日)'
+    r'(?:\s+(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?|\s*(\d{1,2})[时点](\d{1,2})分(?:(\d{1,2})秒)?)?'
+)
+_DATE_SEPARATORS = frozenset('-/.年')
+# 日期解析缓存大小，同一次运行中的所有文件共享
+DATE_CACHE_SIZE = 65536
+# 解析规则版本号，修改日期识别或输出格式时需递增，使已缓存的结果失效
+PARSER_VERSION = '3'
+
+def _could_be_date(date_str):
+    """
+    快速排除非日期：至少8个字符，4位年份开头且紧跟分隔符（date_str 已去除首尾空白）
+    
+    首字符用 isdigit 判断，全角数字等日期正则也接受的字符不会被提前排除。
+    """
+    return len(date_str) >= 8 and date_str[4] in _DATE_SEPARATORS and date_str[0].isdigit()
 
 def parse_chinese_date(date_str):
     """解析多种日期格式"""
@@ -12,139 +61,926 @@ def parse_chinese_date(date_str):
         return None
         
     date_str = date_str.strip()
-    patterns = [
-        (r'^(\d{4})/(\d{1,2})/(\d{1,2})\s+(\d{1,2}):(\d{1,2}):(\d{1,2})$'),
-        (r'^(\d{4})-(\d{1,2})-(\d{1,2})\s+(\d{1,2}):(\d{1,2}):(\d{1,2})$'),
-        (r'^(\d{4})年(\d{1,2})月(\d{1,2})日$'),
-        (r'^(\d{4})/(\d{1,2})/(\d{1,2})$'),
-        (r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
-    ]
-    
-    for pattern in patterns:
-        match = re.match(pattern, date_str)
-        if match:
-            groups = match.groups()
-            year = int(groups[0])
-            
-            if '年' in date_str:
-                month = int(groups[1])
-                day = int(groups[2])
-                hour = minute = second = 0
-            elif '/' in date_str or '-' in date_str:
-                month = int(groups[1])
-                day = int(groups[2])
-                hour = minute = second = 0
-                if len(groups) > 3:
-                    hour = int(groups[3])
-                    minute = int(groups[4])
-                    second = int(groups[5])
-            else:
-                continue
-                
-            return datetime(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
+    if not _could_be_date(date_str):
+        return None
+    
+    match = _DATE_PATTERN.fullmatch(date_str)
+    if not match:
+        return None
+    
+    (year, _sep, month, day, cn_month, cn_day,
+     hour, minute, second, cn_hour, cn_minute, cn_second) = match.groups()
+    if month is None:
+        month, day = cn_month, cn_day
+    if hour is None:
+        hour, minute, second = cn_hour, cn_minute, cn_second
+    
+    try:
+        return datetime(year=int(year), month=int(month), day=int(day),
+                        hour=int(hour) if hour else 0,
+                        minute=int(minute) if minute else 0,
+                        second=int(second) if second else 0)
+    except ValueError:
+        return None
+
+def format_chinese_date(raw_value):
+    """
+    日期格式化，非日期返回None
+    
+    廉价检查不通过的值直接返回，不进入缓存，避免大量非日期文本挤掉真正重复的日期。
+    """
+    if not isinstance(raw_value, str):
+        return None
+    date_str = raw_value.strip()
+    if not _could_be_date(date_str):
+        return None
+    return _format_date_cached(date_str)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _format_date_cached(date_str):
+    """按去除首尾空白后的字符串缓存的日期格式化"""
+    parsed_dt = parse_chinese_date(date_str)
+    if parsed_dt is None:
+        return None
+    return parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
+
+def get_date_cache_stats(since=None):
+    """
+    返回日期解析缓存的命中统计
+    
+    缓存在进程内跨多次运行保留，传入运行开始时的 _format_date_cached.cache_info()，
+    命中和未命中数按本次运行的增量计算。
+    """
+    cache_info = _format_date_cached.cache_info()
+    return {
+        'hits': cache_info.hits - (since.hits if since else 0),
+        'misses': cache_info.misses - (since.misses if since else 0),
+        'size': cache_info.currsize,
+        'max_size': cache_info.maxsize
+    }
+
+# 流式改写工作表XML时使用的字节级正则（兼容带命名空间前缀的元素，如 <x:c>）
+_CELL_PATTERN = re.compile(rb'<((?:\w+:)?)c(?=[\s>/])([^>]*?)(?:/>|>(.*?)</\1c>)', re.DOTALL)
+_CELL_START_PATTERN = re.compile(rb'<(?:\w+:)?c(?=[\s>/])')
+_SHARED_TYPE_PATTERN = re.compile(rb'\st\s*=\s*["\']s["\']')
+_INLINE_STRING_PATTERN = re.compile(rb'<(?:\w+:)?is(?=[\s>])')
+_INLINE_TEXT_PATTERN = re.compile(rb'(<(?:\w+:)?t(?:\s[^>]*)?>)([^<]*)</(?:\w+:)?t>')
+_VALUE_PATTERN = re.compile(rb'(<(?:\w+:)?v(?:\s[^>]*)?>)([^<]*)</(?:\w+:)?v>')
+# 字节级正则中的数字：ASCII 数字或全角数字 ０-９（UTF-8 编码为 EF BC 90-99），
+# 字节模式下 \d 只匹配 ASCII 数字，而日期解析按文本匹配，也接受全角数字
+_DIGIT_BYTES = r'(?:[0-9]|\xef\xbc[\x90-\x99])'
+# 文本以4位年份加分隔符开头才可能是日期，用于跳过绝大多数单元格
+_DATE_HINT_PATTERN = re.compile((r'>\s*' + _DIGIT_BYTES + r'{4}(?:[-/.&]|年)').encode('utf-8'))
+# 流式模式每次读取的字节数
+XML_CHUNK_SIZE = 1024 * 1024
+
+def _format_xml_text(raw_text):
+    """对XML文本节点做日期格式化，返回替换后的字节或None"""
+    text = raw_text.decode('utf-8')
+    if '&' in text:
+        text = html.unescape(text)
+    formatted_date = format_chinese_date(text)
+    if formatted_date:
+        return formatted_date.encode('utf-8')
     return None
 
-def process_xlsx_content_memory(file_data):
-    """在内存中处理xlsx文件内容"""
+def _rewrite_cell(cell_match):
+    """改写单个 <c> 元素中的日期，返回 (新的元素字节或None, 处理数量)"""
+    inner = cell_match.group(3)
+    if not inner or not _DATE_HINT_PATTERN.search(inner):
+        return None, 0
+    
+    count = 0
+    # 处理内联字符串：取 <is> 中的第一个 <t>
+    is_match = _INLINE_STRING_PATTERN.search(inner)
+    if is_match:
+        t_match = _INLINE_TEXT_PATTERN.search(inner, is_match.end())
+        if t_match and t_match.group(2):
+            formatted = _format_xml_text(t_match.group(2))
+            if formatted:
+                inner = inner[:t_match.start(2)] + formatted + inner[t_match.end(2):]
+                count += 1
+    
+    # 处理值元素（共享字符串索引除外）
+    if not _SHARED_TYPE_PATTERN.search(cell_match.group(2)):
+        v_match = _VALUE_PATTERN.search(inner)
+        if v_match and v_match.group(2):
+            formatted = _format_xml_text(v_match.group(2))
+            if formatted:
+                inner = inner[:v_match.start(2)] + formatted + inner[v_match.end(2):]
+                count += 1
+    
+    if not count:
+        return None, 0
+    prefix = cell_match.group(1)
+    return b'<' + prefix + b'c' + cell_match.group(2) + b'>' + inner + b'</' + prefix + b'c>', count
+
+def _iter_worksheet_chunks(source, chunk_size):
+    """按块扫描工作表XML，逐块产出 (改写后的字节, 本块处理数量)"""
+    pending = b''
+    
+    while True:
+        chunk = source.read(chunk_size)
+        data = pending + chunk if pending else chunk
+        output_parts = []
+        write_pos = 0
+        last_cell_end = 0
+        processed_count = 0
+        
+        for cell_match in _CELL_PATTERN.finditer(data):
+            last_cell_end = cell_match.end()
+            new_cell, count = _rewrite_cell(cell_match)
+            if new_cell is not None:
+                output_parts.append(data[write_pos:cell_match.start()])
+                output_parts.append(new_cell)
+                write_pos = last_cell_end
+                processed_count += count
+        
+        if not chunk:
+            cut = len(data)
+        else:
+            # 未闭合的单元格或被截断的标签留到下一块处理
+            open_cell = _CELL_START_PATTERN.search(data, last_cell_end)
+            if open_cell:
+                cut = open_cell.start()
+            else:
+                cut = data.rfind(b'<', last_cell_end)
+                if cut < 0:
+                    cut = len(data)
+        
+        output_parts.append(data[write_pos:cut])
+        yield b''.join(output_parts), processed_count
+        pending = data[cut:]
+        
+        if not chunk:
+            return
+
+def process_worksheet_stream(source, target, chunk_size=XML_CHUNK_SIZE):
+    """
+    流式改写工作表XML：按块读取，逐个单元格扫描，边读边写。
+    
+    不构建元素树，内存占用只与块大小有关；非日期内容按原始字节写出。
+    """
     processed_count = 0
+    for output, count in _iter_worksheet_chunks(source, chunk_size):
+        target.write(output)
+        processed_count += count
+    return processed_count
+
+def _is_worksheet(file_name):
+    """判断ZIP成员是否为工作表XML"""
+    return file_name.startswith('xl/worksheets/') and file_name.endswith('.xml')
+
+def _worksheet_has_dates(zip_ref, info):
+    """流式预扫描工作表，遇到第一个日期单元格即返回True"""
+    with zip_ref.open(info) as source:
+        return any(count for _, count in _iter_worksheet_chunks(source, XML_CHUNK_SIZE))
+
+def _stream_worksheet_member(zip_ref, new_zip, info):
+    """将工作表从源ZIP流式改写到目标ZIP，返回处理数量"""
+    # 日期变长后可能超过未压缩大小，超大工作表预先启用ZIP64
+    force_zip64 = info.file_size * 3 >= zipfile.ZIP64_LIMIT
+    with zip_ref.open(info) as source, new_zip.open(_rewritten_info(info), 'w', force_zip64=force_zip64) as target:
+        return process_worksheet_stream(source, target)
+
+_LOCAL_HEADER_STRUCT = struct.Struct('<4s2B4HL2L2H')
+_DATA_DESCRIPTOR_FLAG = 0x08
+_ZIP64_EXTRA_ID = 0x0001
+# 原样拷贝压缩数据时的块大小
+RAW_COPY_CHUNK_SIZE = 1024 * 1024
+# 原样读写压缩数据依赖的 ZipFile 内部属性（zipfile 没有公开的原样拷贝接口）
+_RAW_READ_ATTRS = ('_lock', 'fp')
+_RAW_WRITE_ATTRS = ('_lock', 'fp', 'start_dir', '_seekable', '_writecheck', '_didModify', 'filelist', 'NameToInfo')
+
+def _supports_raw_io(zip_file, attrs):
+    """检查 zipfile 的内部实现是否仍提供原样读写需要的属性，缺失时改用公开接口"""
+    return hasattr(zipfile.ZipInfo, 'FileHeader') and all(hasattr(zip_file, name) for name in attrs)
+
+def _strip_zip64_extra(extra):
+    """去掉extra字段中的ZIP64记录，写入时由ZipInfo按需重新生成"""
+    fields = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        field_id, field_size = struct.unpack('<HH', extra[pos:pos + 4])
+        end = pos + 4 + field_size
+        if field_id != _ZIP64_EXTRA_ID:
+            fields.append(extra[pos:end])
+        pos = end
+    return b''.join(fields)
+
+def _copy_member_decompressed(zip_ref, new_zip, info):
+    """通过 zipfile 的公开接口解压后按原压缩方式重新写入，内部属性不可用时使用"""
+    new_info = copy.copy(info)
+    new_info.extra = _strip_zip64_extra(info.extra)
+    force_zip64 = info.file_size >= zipfile.ZIP64_LIMIT
+    with zip_ref.open(info) as source, new_zip.open(new_info, 'w', force_zip64=force_zip64) as target:
+        shutil.copyfileobj(source, target, RAW_COPY_CHUNK_SIZE)
+
+def _copy_member_raw(zip_ref, new_zip, info):
+    """
+    将未修改的ZIP成员按原始压缩数据写入目标ZIP，不解压也不重新压缩。
+    
+    保留原有的压缩方式、CRC和大小；zipfile没有公开的原样拷贝接口，
+    这里按 ZipFile.mkdir 的写法直接写入本地文件头和数据。
+    当前Python版本缺少所需的内部属性时，退回到解压后重新压缩的拷贝。
+    """
+    if not (_supports_raw_io(zip_ref, _RAW_READ_ATTRS) and _supports_raw_io(new_zip, _RAW_WRITE_ATTRS)):
+        _copy_member_decompressed(zip_ref, new_zip, info)
+        return
+    
+    new_info = copy.copy(info)
+    # 大小和CRC已知，直接写在本地文件头中，不需要数据描述符
+    new_info.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    new_info.extra = _strip_zip64_extra(info.extra)
+    
+    with zip_ref._lock:
+        _write_member_raw(new_zip, new_info, _iter_member_raw(zip_ref, info))
+
+def _iter_member_raw(zip_ref, info):
+    """逐块读取ZIP成员的原始压缩数据，不解压；调用方需持有 zip_ref._lock"""
+    zip_ref.fp.seek(info.header_offset)
+    header = _LOCAL_HEADER_STRUCT.unpack(zip_ref.fp.read(_LOCAL_HEADER_STRUCT.size))
+    zip_ref.fp.seek(header[-2] + header[-1], io.SEEK_CUR)  # 跳过文件名和extra字段
     
-    with zipfile.ZipFile(io.BytesIO(file_data), 'r') as zip_ref:
-        file_list = zip_ref.namelist()
-        modified_files = {}
+    remaining = info.compress_size
+    while remaining > 0:
+        block = zip_ref.fp.read(min(remaining, RAW_COPY_CHUNK_SIZE))
+        if not block:
+            raise zipfile.BadZipFile(f"压缩数据不完整: {info.filename}")
+        yield block
+        remaining -= len(block)
+
+def _write_member_raw(new_zip, new_info, blocks):
+    """
+    按 ZipFile.mkdir 的写法写入本地文件头，再依次写入已压缩好的数据块。
+    
+    new_info 中的压缩方式、CRC和大小必须与数据一致；原样拷贝和进程池写回共用这一写法。
+    """
+    with new_zip._lock:
+        if new_zip._seekable:
+            new_zip.fp.seek(new_zip.start_dir)
+        new_info.header_offset = new_zip.fp.tell()
+        new_zip._writecheck(new_info)
+        new_zip._didModify = True
+        new_zip.filelist.append(new_info)
+        new_zip.NameToInfo[new_info.filename] = new_info
+        new_zip.fp.write(new_info.FileHeader())
+        for block in blocks:
+            new_zip.fp.write(block)
+        new_zip.start_dir = new_zip.fp.tell()
+
+def _rewritten_info(info):
+    """
+    改写后成员的 ZipInfo：沿用源成员的名称、修改时间和文件属性，按 DEFLATED 压缩。
+    
+    串行改写和进程池写回都用它生成文件头，两条路径的输出逐字节相同。
+    """
+    new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    new_info.compress_type = zipfile.ZIP_DEFLATED
+    new_info.external_attr = info.external_attr
+    return new_info
+
+def _read_member_raw(zip_ref, info):
+    """
+    读取ZIP成员的原始压缩数据，返回 (数据, 压缩方式)
+    
+    内部属性不可用时改为解压读取，压缩方式返回 ZIP_STORED。
+    """
+    if not _supports_raw_io(zip_ref, _RAW_READ_ATTRS):
+        return zip_ref.read(info), zipfile.ZIP_STORED
+    with zip_ref._lock:
+        return b''.join(_iter_member_raw(zip_ref, info)), info.compress_type
+
+def _write_member_compressed(new_zip, info, compressed, crc, file_size):
+    """把已在其他进程中压缩好的成员数据写入目标ZIP，文件头与串行改写相同"""
+    new_info = _rewritten_info(info)
+    new_info.file_size = file_size
+    if not _supports_raw_io(new_zip, _RAW_WRITE_ATTRS):
+        with new_zip.open(new_info, 'w') as target:
+            target.write(zlib.decompress(compressed, -zlib.MAX_WBITS))
+        return
+    
+    new_info.CRC = crc
+    new_info.compress_size = len(compressed)
+    _write_member_raw(new_zip, new_info, (compressed,))
+
+# 每个进程同时排队的工作表数：主进程按成员顺序边读边提交，内存中最多只有这么多张工作表的原始数据
+SHEETS_IN_FLIGHT_PER_WORKER = 2
+
+def _sheet_pool_context():
+    """
+    工作表进程池的启动方式
+    
+    main 在线程池中调用 process_xlsx_stream，fork 会把其他线程持有中的锁一起复制到子进程，
+    因此优先用 forkserver，平台不支持时（如 Windows）用 spawn。
+    两种方式的子进程都要重新导入本模块，调用方的主模块需要能被导入（不能是交互式输入）。
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+def rewrite_worksheet_raw(compressed, compress_type, skip_unchanged=True):
+    """
+    进程池中处理单个工作表：解压原始数据、改写日期、重新压缩
+    
+    只需要工作表本身的字节：共享字符串中的日期在主进程中直接改写，
+    工作表里 t="s" 的单元格只保存索引，不需要再查表。
+    
+    :return: (压缩数据, CRC, 未压缩大小, 处理数量)；没有变化且 skip_unchanged 时压缩数据为None
+    """
+    if compress_type == zipfile.ZIP_DEFLATED:
+        content = zlib.decompress(compressed, -zlib.MAX_WBITS)
+    else:
+        content = compressed
+    
+    output = io.BytesIO()
+    processed_count = process_worksheet_stream(io.BytesIO(content), output)
+    if not processed_count and skip_unchanged:
+        return None, 0, 0, 0
+    
+    data = output.getvalue()
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(), zlib.crc32(data), len(data), processed_count
+
+class _MappedFile(io.RawIOBase):
+    """只读 mmap 的文件对象包装：mmap 在 Python 3.13 之前没有 seekable()，zipfile 无法直接读取"""
+    
+    def __init__(self, mapped):
+        self._mapped = mapped
+        mapped.seek(0)
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def read(self, size=-1):
+        return self._mapped.read(size if size is not None and size >= 0 else None)
+    
+    def readinto(self, buffer):
+        data = self._mapped.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._mapped.seek(offset, whence)
+        return self._mapped.tell()
+    
+    def tell(self):
+        return self._mapped.tell()
+
+def _open_source(file_data):
+    """把输入数据包装为可读、可定位的文件对象，不复制数据（bytes 交给 BytesIO，不修改时共享同一块内存）"""
+    if isinstance(file_data, mmap.mmap):
+        return _MappedFile(file_data)
+    return io.BytesIO(file_data)
+
+def process_xlsx_content_memory(file_data, streaming=False, skip_unchanged=True, sheet_workers=1):
+    """
+    在内存中处理xlsx文件内容
+    
+    streaming=True 时工作表以流式方式改写，不再构建整张表的元素树，
+    内存占用与行数无关；未包含日期的工作表按原始字节输出。
+    skip_unchanged=True 时没有任何单元格变化的工作表和共享字符串不重新序列化，
+    与图片、样式等其他未修改成员一样按原始压缩数据拷贝。
+    sheet_workers 大于1时各工作表分发到进程池并行改写（见 process_xlsx_stream）。
+    """
+    output_buffer = io.BytesIO()
+    processed_count = process_xlsx_stream(_open_source(file_data), output_buffer, streaming, skip_unchanged,
+                                          sheet_workers)
+    return output_buffer.getvalue(), processed_count
+
+_SPREADSHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+def _rewrite_shared_strings_tree(content):
+    """改写共享字符串表中的日期，返回 (元素树根节点, 处理数量)"""
+    root = ET.fromstring(content)
+    part_count = 0
+    
+    for si in root.findall(f'.//{_SPREADSHEET_NS}si'):
+        t_elem = si.find(f'.//{_SPREADSHEET_NS}t')
+        if t_elem is not None and t_elem.text:
+            formatted_date = format_chinese_date(t_elem.text)
+            if formatted_date:
+                t_elem.text = formatted_date
+                part_count += 1
+    return root, part_count
+
+def _rewrite_worksheet_tree(content):
+    """以元素树方式改写工作表中的日期，返回 (元素树根节点, 处理数量)"""
+    root = ET.fromstring(content)
+    part_count = 0
+    
+    for c in root.findall(f'.//{_SPREADSHEET_NS}c'):
+        # 处理内联字符串
+        is_elem = c.find(f'.//{_SPREADSHEET_NS}is')
+        if is_elem is not None:
+            t_elem = is_elem.find(f'.//{_SPREADSHEET_NS}t')
+            if t_elem is not None and t_elem.text:
+                formatted_date = format_chinese_date(t_elem.text)
+                if formatted_date:
+                    t_elem.text = formatted_date
+                    part_count += 1
         
-        # 处理共享字符串文件
-        shared_strings_name = 'xl/sharedStrings.xml'
-        if shared_strings_name in file_list:
-            content = zip_ref.read(shared_strings_name)
-            root = ET.fromstring(content)
+        # 处理值元素
+        v_elem = c.find(f'.//{_SPREADSHEET_NS}v')
+        if v_elem is not None and v_elem.text and c.get('t') != 's':
+            formatted_date = format_chinese_date(v_elem.text)
+            if formatted_date:
+                v_elem.text = formatted_date
+                part_count += 1
+    return root, part_count
+
+def process_xlsx_stream(source, target, streaming=False, skip_unchanged=True, sheet_workers=1):
+    """
+    处理xlsx文件对象 source，把结果写入可定位的文件对象 target（内存缓冲或磁盘文件）
+    
+    sheet_workers 大于1且有多个工作表时，每个工作表的原始压缩数据交给进程池，
+    在子进程中解压、改写并重新压缩，主进程同时处理共享字符串，最后按原顺序写回。
+    工作表按成员顺序分批提交，每写回一张再读入下一张，不会一次把所有工作表读入内存。
+    
+    :return: 转换的日期数量
+    """
+    processed_count = 0
+    
+    with zipfile.ZipFile(source, 'r') as zip_ref, ExitStack() as stack:
+        # 多个工作表时先把前几张工作表分发到进程池，与下面的共享字符串处理同时进行
+        parallel_sheets = [
+            info for info in zip_ref.infolist()
+            if _is_worksheet(info.filename) and info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+        ]
+        sheet_futures = {}
+        if sheet_workers > 1 and len(parallel_sheets) > 1:
+            workers = min(sheet_workers, len(parallel_sheets))
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers, mp_context=_sheet_pool_context()))
+            pending_sheets = iter(parallel_sheets)
             
-            for si in root.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}si'):
-                t_elem = si.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')
-                if t_elem is not None and t_elem.text:
-                    parsed_dt = parse_chinese_date(t_elem.text)
-                    if parsed_dt:
-                        t_elem.text = parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
-                        processed_count += 1
+            def submit_sheets():
+                # 按成员顺序补足排队中的工作表，下面按同样的顺序取结果，当前成员总是已经提交
+                while len(sheet_futures) < workers * SHEETS_IN_FLIGHT_PER_WORKER:
+                    info = next(pending_sheets, None)
+                    if info is None:
+                        return
+                    sheet_futures[info.filename] = pool.submit(
+                        rewrite_worksheet_raw, *_read_member_raw(zip_ref, info), skip_unchanged)
             
-            modified_files[shared_strings_name] = ET.tostring(root, encoding='utf-8', xml_declaration=True)
+            submit_sheets()
+            parallel_names = {info.filename for info in parallel_sheets}
+        else:
+            parallel_names = set()
         
-        # 处理工作表文件
-        for file_name in file_list:
-            if file_name.startswith('xl/worksheets/') and file_name.endswith('.xml'):
-                content = zip_ref.read(file_name)
-                root = ET.fromstring(content)
-                
-                for c in root.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}c'):
-                    # 处理内联字符串
-                    is_elem = c.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}is')
-                    if is_elem is not None:
-                        t_elem = is_elem.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')
-                        if t_elem is not None and t_elem.text:
-                            parsed_dt = parse_chinese_date(t_elem.text)
-                            if parsed_dt:
-                                t_elem.text = parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
-                                processed_count += 1
-                    
-                    # 处理值元素
-                    v_elem = c.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}v')
-                    if v_elem is not None and v_elem.text and c.get('t') != 's':
-                        parsed_dt = parse_chinese_date(v_elem.text)
-                        if parsed_dt:
-                            v_elem.text = parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
-                            processed_count += 1
+        # 逐个成员处理并立即写入输出：修改过的部件写完即释放，同一时刻最多只有一个元素树
+        with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as new_zip:
+            for info in zip_ref.infolist():
+                file_name = info.filename
+                if file_name == 'xl/sharedStrings.xml':
+                    root, part_count = _rewrite_shared_strings_tree(zip_ref.read(info))
+                elif file_name in parallel_names:
+                    compressed, crc, file_size, count = sheet_futures.pop(file_name).result()
+                    if compressed is None:
+                        _copy_member_raw(zip_ref, new_zip, info)
+                    else:
+                        _write_member_compressed(new_zip, info, compressed, crc, file_size)
+                        processed_count += count
+                    submit_sheets()
+                    continue
+                elif _is_worksheet(file_name) and streaming:
+                    # 流式模式下边读边写，不构建元素树
+                    if not skip_unchanged or _worksheet_has_dates(zip_ref, info):
+                        processed_count += _stream_worksheet_member(zip_ref, new_zip, info)
+                    else:
+                        _copy_member_raw(zip_ref, new_zip, info)
+                    continue
+                elif _is_worksheet(file_name):
+                    root, part_count = _rewrite_worksheet_tree(zip_ref.read(info))
+                else:
+                    _copy_member_raw(zip_ref, new_zip, info)
+                    continue
                 
-                modified_files[file_name] = ET.tostring(root, encoding='utf-8', xml_declaration=True)
-        
-        # 重新打包为内存中的ZIP文件
-        output_buffer = io.BytesIO()
-        with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as new_zip:
-            for file_name in file_list:
-                if file_name in modified_files:
-                    new_zip.writestr(file_name, modified_files[file_name])
+                processed_count += part_count
+                if part_count or not skip_unchanged:
+                    force_zip64 = info.file_size * 3 >= zipfile.ZIP64_LIMIT
+                    with new_zip.open(_rewritten_info(info), 'w', force_zip64=force_zip64) as part_target:
+                        ET.ElementTree(root).write(part_target, encoding='utf-8', xml_declaration=True)
                 else:
-                    new_zip.writestr(file_name, zip_ref.read(file_name))
+                    _copy_member_raw(zip_ref, new_zip, info)
+                root = None
+    
+    return processed_count
+
+# Word/PowerPoint 文本部件：正文、页眉、页脚、脚注、尾注和幻灯片
+_OFFICE_TEXT_PART_PATTERN = re.compile(
+    r'word/(?:document|header\d*|footer\d*|footnotes|endnotes)\.xml|ppt/slides/slide\d+\.xml')
+# 文本元素 <w:t>/<a:t>，以及分隔段落文本的段落、制表符和换行标签
+_TEXT_RUN_PATTERN = re.compile(
+    rb'(<((?:\w+:)?)t(?:\s[^>]*)?>)([^<]*)</\2t>'
+    rb'|<(?:\w+:)?(?:p|tab|br|cr)(?=[\s/>])|</(?:\w+:)?p>')
+_PARAGRAPH_END_PATTERN = re.compile(rb'</(?:\w+:)?p>')
+# 段落文本中的日期：前后不能紧接数字、ASCII字母或点号，v2024.1.3 这类版本号不当作日期；
+# 中文可以紧接日期（于2024年3月8日召开），句末点号后面没有数字或字母时也可以
+_TEXT_DATE_PATTERN = re.compile(
+    r'(?<![\dA-Za-z_.])(?:' + _DATE_PATTERN.pattern + r')(?!\.?[\dA-Za-z_])')
+_TEXT_DATE_HINT_PATTERN = re.compile(r'\d{4}(?:[-/.]|年)')
+_XML_TEXT_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+
+def _is_office_text_part(file_name):
+    """判断ZIP成员是否为需要处理的 Word/PowerPoint 文本部件"""
+    return _OFFICE_TEXT_PART_PATTERN.fullmatch(file_name) is not None
+
+def _rewrite_text_group(group, preserve_space, edits):
+    """
+    改写一组连续文本元素（同一段落中两个制表符/换行之间）里的日期
+    
+    日期可能被拆分在多个 run 中：按拼接后的文本查找，格式化结果写入日期起点所在的
+    文本元素，其余元素只删去属于日期的字符，各 run 的格式保持不变。
+    
+    :param edits: 收集 (起点, 终点, 新字节)，对应原始数据中需要替换的区间
+    :return: 处理数量
+    """
+    texts = [html.unescape(match.group(3).decode('utf-8')) for match in group]
+    joined = ''.join(texts)
+    if not _TEXT_DATE_HINT_PATTERN.search(joined):
+        return 0
+    
+    replacements = []
+    for date_match in _TEXT_DATE_PATTERN.finditer(joined):
+        formatted_date = format_chinese_date(date_match.group(0))
+        if formatted_date and formatted_date != date_match.group(0):
+            replacements.append((date_match.start(), date_match.end(), formatted_date))
+    if not replacements:
+        return 0
+    
+    offset = 0
+    for match, text in zip(group, texts):
+        seg_start, seg_end = offset, offset + len(text)
+        offset = seg_end
+        new_text = text
+        # 从后往前替换，前面的下标不受影响
+        for start, end, formatted_date in reversed(replacements):
+            if end <= seg_start or start >= seg_end:
+                continue
+            cut_start, cut_end = max(start, seg_start) - seg_start, min(end, seg_end) - seg_start
+            insert = formatted_date if seg_start <= start else ''
+            new_text = new_text[:cut_start] + insert + new_text[cut_end:]
+        if new_text == text:
+            continue
+        escaped = ''.join(_XML_TEXT_ESCAPES.get(char, char) for char in new_text).encode('utf-8')
+        open_tag = match.group(1)
+        if preserve_space and new_text != new_text.strip() and b'xml:space' not in open_tag:
+            # Word 默认去掉文本元素首尾的空白，日期移走后留下的空格需要保留
+            edits.append((match.start(1), match.end(1), open_tag[:-1] + b' xml:space="preserve">'))
+        edits.append((match.start(3), match.end(3), escaped))
+    return len(replacements)
+
+def _rewrite_text_part(data, preserve_space):
+    """改写一段以段落边界结束的 Word/PowerPoint XML 字节，返回 (新的字节, 处理数量)"""
+    edits = []
+    processed_count = 0
+    group = []
+    for match in _TEXT_RUN_PATTERN.finditer(data):
+        if match.group(1):
+            group.append(match)
+            continue
+        if group:
+            processed_count += _rewrite_text_group(group, preserve_space, edits)
+            group = []
+    if group:
+        processed_count += _rewrite_text_group(group, preserve_space, edits)
+    if not edits:
+        return data, 0
+    
+    output_parts = []
+    write_pos = 0
+    for start, end, replacement in edits:
+        output_parts.append(data[write_pos:start])
+        output_parts.append(replacement)
+        write_pos = end
+    output_parts.append(data[write_pos:])
+    return b''.join(output_parts), processed_count
+
+def _iter_text_part_chunks(source, preserve_space, chunk_size):
+    """按块扫描文本部件XML，每块在最后一个段落结束标签处截断，逐块产出 (改写后的字节, 本块处理数量)"""
+    pending = b''
+    
+    while True:
+        chunk = source.read(chunk_size)
+        data = pending + chunk if pending else chunk
+        
+        if chunk:
+            cut = 0
+            for paragraph_end in _PARAGRAPH_END_PATTERN.finditer(data):
+                cut = paragraph_end.end()
+        else:
+            cut = len(data)
         
-        return output_buffer.getvalue(), processed_count
+        if cut:
+            yield _rewrite_text_part(data[:cut], preserve_space)
+        pending = data[cut:]
+        
+        if not chunk:
+            return
+
+def _text_part_has_dates(zip_ref, info, preserve_space):
+    """流式预扫描文本部件，遇到第一个需要改写的日期即返回True"""
+    with zip_ref.open(info) as source:
+        return any(count for _, count in _iter_text_part_chunks(source, preserve_space, XML_CHUNK_SIZE))
+
+def process_office_stream(source, target, streaming=False, skip_unchanged=True):
+    """
+    处理 docx/pptx 文件对象 source，把结果写入可定位的文件对象 target
+    
+    直接改写正文、页眉页脚和幻灯片XML中的日期，不经过解析、LLM 和重建；
+    文本按原始字节处理，只替换日期所在的文本元素，其余成员原样拷贝。
+    streaming=True 时文本部件按块流式改写，内存占用与文档大小无关。
+    
+    :return: 转换的日期数量
+    """
+    processed_count = 0
+    
+    with zipfile.ZipFile(source, 'r') as zip_ref, \
+            zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as new_zip:
+        for info in zip_ref.infolist():
+            file_name = info.filename
+            if not _is_office_text_part(file_name):
+                _copy_member_raw(zip_ref, new_zip, info)
+                continue
+            
+            preserve_space = file_name.startswith('word/')
+            if streaming:
+                if skip_unchanged and not _text_part_has_dates(zip_ref, info, preserve_space):
+                    _copy_member_raw(zip_ref, new_zip, info)
+                    continue
+                force_zip64 = info.file_size * 3 >= zipfile.ZIP64_LIMIT
+                with zip_ref.open(info) as part_source, \
+                        new_zip.open(_rewritten_info(info), 'w', force_zip64=force_zip64) as part_target:
+                    for output, count in _iter_text_part_chunks(part_source, preserve_space, XML_CHUNK_SIZE):
+                        part_target.write(output)
+                        processed_count += count
+                continue
+            
+            output, part_count = _rewrite_text_part(zip_ref.read(info), preserve_space)
+            processed_count += part_count
+            if part_count or not skip_unchanged:
+                new_zip.writestr(_rewritten_info(info), output)
+            else:
+                _copy_member_raw(zip_ref, new_zip, info)
+    
+    return processed_count
+
+# 文本字段分隔符（含换行），与原先按 [\t,;|] 切分字段的规则一致
+_TEXT_DELIMITERS = b'\t,;|\r\n'
+# 候选日期字段：位于字段开头，去掉前导空格后以4位年份加分隔符开头，延伸到下一个分隔符
+_TEXT_DATE_FIELD_PATTERN = re.compile(
+    (r'(?:\A|(?<=[\t,;|\r\n]))[ \x0b\x0c]*' + _DIGIT_BYTES + r'{4}(?:[-/.]|年)[^\t,;|\r\n]*').encode('utf-8'))
+# 流式处理文本时每次读取的字节数
+TEXT_CHUNK_SIZE = 1024 * 1024
+
+def _rewrite_text_chunk(data):
+    """改写一段以字段边界开头和结尾的字节，只替换整个字段都是日期的部分"""
+    processed_count = 0
+    
+    def replace_field(field_match):
+        nonlocal processed_count
+        field = field_match.group(0)
+        stripped = field.strip()
+        try:
+            formatted_date = format_chinese_date(stripped.decode('utf-8'))
+        except UnicodeDecodeError:
+            return field
+        if not formatted_date:
+            return field
+        processed_count += 1
+        # 保留字段前后的空白，只替换日期本身
+        lead = len(field) - len(field.lstrip())
+        return field[:lead] + formatted_date.encode('utf-8') + field[lead + len(stripped):]
+    
+    return _TEXT_DATE_FIELD_PATTERN.sub(replace_field, data), processed_count
+
+def process_text_stream(source, target, chunk_size=TEXT_CHUNK_SIZE):
+    """
+    流式处理文本文件（UTF-8 编码的 CSV/TSV/TXT）
+    
+    按固定大小的块读写，每块在最后一个分隔符处截断，剩余部分并入下一块；
+    分隔符、换行符和非日期内容按原始字节写出，内存占用只与块大小有关。
+    
+    :return: 转换的日期数量
+    """
+    processed_count = 0
+    pending = b''
+    
+    while True:
+        chunk = source.read(chunk_size)
+        data = pending + chunk if pending else chunk
+        
+        if chunk:
+            cut = max(data.rfind(delimiter) for delimiter in _TEXT_DELIMITERS) + 1
+        else:
+            cut = len(data)
+        
+        if cut:
+            output, count = _rewrite_text_chunk(data[:cut])
+            target.write(output)
+            processed_count += count
+        pending = data[cut:]
+        
+        if not chunk:
+            return processed_count
+
+def is_utf8_data(data, chunk_size=TEXT_CHUNK_SIZE):
+    """分块校验数据是否为合法的 UTF-8，不生成完整的解码副本"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    view = memoryview(data)
+    try:
+        for start in range(0, len(view), chunk_size):
+            decoder.decode(view[start:start + chunk_size])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
 
 def process_text_file_memory(content):
     """在内存中处理文本文件"""
+    output_buffer = io.BytesIO()
+    processed_count = process_text_stream(io.BytesIO(content.encode('utf-8')), output_buffer)
+    return output_buffer.getvalue().decode('utf-8'), processed_count
+
+# 表格模式：每列取样的行数，以及样本中日期占比达到多少视为日期列
+TABULAR_SAMPLE_ROWS = 200
+DATE_COLUMN_RATIO = 0.6
+# 整列批量匹配用的锚定正则，分组与 _DATE_PATTERN 一致
+_DATE_COLUMN_PATTERN = r'^\s*(?:' + _DATE_PATTERN.pattern + r')\s*\Z'
+
+# is_date_column、_convert_unique_values、convert_date_values 与 date_parser.py 中的实现相同：
+# Dify 代码节点只能是单个自包含文件，无法导入 date_parser。修改这里时需同步修改那一份。
+def is_date_column(sample_values, min_ratio=DATE_COLUMN_RATIO):
+    """根据样本判断是否为日期列：非空样本中能解析为日期的比例达到阈值"""
+    values = [v for v in sample_values if isinstance(v, str) and v.strip()]
+    if not values:
+        return False
+    hits = sum(1 for v in values if format_chinese_date(v))
+    return hits / len(values) >= min_ratio
+
+def _convert_unique_values(values):
+    """向量化转换一组互不相同的值，返回与输入等长的列表，非日期位置为None"""
+    series = pd.Series(values, dtype=object)
+    is_text = series.map(lambda v: isinstance(v, str))
+    parts = series.where(is_text).astype(object).str.extract(_DATE_COLUMN_PATTERN)
+    matched = parts[0].notna()
+    converted = [None] * len(values)
+    if not matched.any():
+        return converted
+    
+    fields = pd.DataFrame({
+        'year': parts[0],
+        'month': parts[2].fillna(parts[4]),
+        'day': parts[3].fillna(parts[5]),
+        'hour': parts[6].fillna(parts[9]).fillna('0'),
+        'minute': parts[7].fillna(parts[10]).fillna('0'),
+        'second': parts[8].fillna(parts[11]).fillna('0'),
+    })[matched].astype('int64')
+    parsed = pd.to_datetime(fields, errors='coerce')
+    formatted = parsed.dt.strftime('%Y-%m-%d %H:%M:%S')
+    
+    for index, valid in parsed.notna().items():
+        if valid:
+            converted[index] = formatted[index]
+        else:
+            # pandas 无法表示的日期（如年份超出范围）逐个解析
+            converted[index] = format_chinese_date(values[index])
+    return converted
+
+def convert_date_values(values):
+    """
+    整列批量转换日期，返回 (转换后的列表, 转换数量)，非日期值保持不变
+    
+    有 pandas 时先对整列去重，再对不同的值做一次向量化的字符串提取和 to_datetime，
+    最后按编码映射回整列；重复值很多的日期列只需处理少量不同值。
+    """
+    values = list(values)
+    if pd is None:
+        converted = [format_chinese_date(v) if isinstance(v, str) else None for v in values]
+        return [c or v for c, v in zip(converted, values)], sum(1 for c in converted if c)
+    
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    converted_uniques = _convert_unique_values(list(uniques))
+    # 编码 -1（空值）映射到末尾追加的“未转换”位置
+    changed = np.array([c is not None for c in converted_uniques] + [False])
+    lookup = np.array(converted_uniques + [None], dtype=object)
+    mask = changed[codes]
+    
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    result[mask] = lookup[codes[mask]]
+    return result.tolist(), int(mask.sum())
+
+def _detect_tabular_layout(sample_lines):
+    """根据样本行推断分隔符和日期列下标，无法推断时抛出 csv.Error"""
+    sample_text = b'\n'.join(sample_lines).decode('utf-8')
+    delimiter = csv.Sniffer().sniff(sample_text, delimiters='\t,;|').delimiter.encode('utf-8')
+    
+    columns = {}
+    for line in sample_lines:
+        for index, field in enumerate(line.split(delimiter)):
+            columns.setdefault(index, []).append(field.decode('utf-8'))
+    date_columns = sorted(index for index, values in columns.items() if is_date_column(values))
+    return delimiter, date_columns
+
+def _rewrite_tabular_lines(data, delimiter, date_columns):
+    """改写一段完整行：只切分出日期列的字段批量转换，其余字段原样保留"""
+    lines = data.split(b'\n')
+    locations = []
+    raw_values = []
+    quoted = []
+    # 最后一个日期列之后的字段不必切开，拼接时原样还原
+    max_split = date_columns[-1] + 1
+    
+    for line_index, line in enumerate(lines):
+        if b'"' in line:
+            # 含引号的行字段中可能包含分隔符，交给通用的字段扫描处理
+            quoted.append(line_index)
+            continue
+        fields = line.split(delimiter, max_split)
+        for column in date_columns:
+            if column < len(fields):
+                stripped = fields[column].strip()
+                if stripped:
+                    locations.append((line_index, column, fields))
+                    raw_values.append(stripped.decode('utf-8', 'replace'))
+    
     processed_count = 0
-    lines = content.split('\n')
-    modified = False
-    
-    for i, line in enumerate(lines):
-        parts = re.split(r'[\t,;|]', line)
-        line_modified = False
-        
-        for j, part in enumerate(parts):
-            parsed_dt = parse_chinese_date(part.strip())
-            if parsed_dt:
-                parts[j] = parsed_dt.strftime("%Y-%m-%d %H:%M:%S")
-                processed_count += 1
-                line_modified = True
-        
-        if line_modified:
-            if '\t' in line:
-                lines[i] = '\t'.join(parts)
-            elif ',' in line:
-                lines[i] = ','.join(parts)
-            elif ';' in line:
-                lines[i] = ';'.join(parts)
-            elif '|' in line:
-                lines[i] = '|'.join(parts)
-            else:
-                lines[i] = ' '.join(parts)
-            modified = True
+    converted, _ = convert_date_values(raw_values)
+    changed_lines = {}
+    for (line_index, column, fields), raw, new in zip(locations, raw_values, converted):
+        if new != raw:
+            field = fields[column]
+            lead = len(field) - len(field.lstrip())
+            fields[column] = field[:lead] + new.encode('utf-8') + field[lead + len(field.strip()):]
+            changed_lines[line_index] = fields
+            processed_count += 1
+    for line_index, fields in changed_lines.items():
+        lines[line_index] = delimiter.join(fields)
+    
+    for line_index in quoted:
+        lines[line_index], count = _rewrite_text_chunk(lines[line_index])
+        processed_count += count
     
-    return '\n'.join(lines), processed_count
+    return b'\n'.join(lines), processed_count
+
+def process_tabular_stream(source, target, sample_rows=TABULAR_SAMPLE_ROWS, chunk_size=TEXT_CHUNK_SIZE):
+    """
+    表格模式流式处理 CSV/TSV：用前 sample_rows 行推断分隔符和日期列，
+    之后每块只切分并批量转换日期列的字段，其余列不做任何解析。
+    
+    换行符和非日期内容按原始字节写出；样本中日期占比不足的列整列跳过。
+    
+    :return: 转换的日期数量
+    :raises csv.Error: 无法推断分隔符时，由调用方退回普通流式处理
+    """
+    head = source.read(chunk_size)
+    while head.count(b'\n') < sample_rows:
+        more = source.read(chunk_size)
+        if not more:
+            break
+        head += more
+    
+    delimiter, date_columns = _detect_tabular_layout(head.split(b'\n')[:sample_rows])
+    if not date_columns:
+        target.write(head)
+        for block in iter(lambda: source.read(chunk_size), b''):
+            target.write(block)
+        return 0
+    
+    processed_count = 0
+    pending = head
+    while True:
+        chunk = source.read(chunk_size)
+        data = pending + chunk if chunk else pending
+        cut = data.rfind(b'\n') + 1 if chunk else len(data)
+        if cut:
+            output, count = _rewrite_tabular_lines(data[:cut], delimiter, date_columns)
+            target.write(output)
+            processed_count += count
+        pending = data[cut:]
+        if not chunk:
+            return processed_count
+
+def map_file(file_path):
+    """以只读方式内存映射文件，数据按需从页缓存读取；空文件返回 b''"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
 def get_file_data(file_info):
-    """获取文件数据，支持多种输入格式"""
-    # 方式1: 直接从path读取
+    """
+    获取文件数据，支持多种输入格式
+    
+    从 path 读取时返回只读 mmap，不把整个文件读入内存；用完后由调用方 close()。
+    """
+    # 方式1: 直接从path映射
     file_path = file_info.get('path', '')
     if file_path and os.path.exists(file_path):
-        with open(file_path, 'rb') as f:
-            return f.read()
+        return map_file(file_path)
     
     # 方式2: 从content字段读取（base64编码）
     content = file_info.get('content', '')
@@ -166,65 +1002,361 @@ def get_file_data(file_info):
     # 如果都没有，返回空数据
     return b''
 
-def main(files):
-    """Dify Code Node 主函数 - 修复版本"""
-    result_files = []
+def process_file_data(file_name, file_data, streaming=False, skip_unchanged=True, tabular=False, sheet_workers=1):
+    """根据文件类型处理文件数据，返回 (处理后的数据, 处理数量)"""
+    if not file_name.endswith(('.xlsx', '.xls', '.docx', '.pptx', '.txt', '.csv', '.tsv')) and not is_utf8_data(file_data):
+        # 如果不是文本文件，直接返回原数据
+        return file_data, 0
     
-    # 检查输入
-    if not files or not isinstance(files, list):
-        return {"result": []}
+    output_buffer = io.BytesIO()
+    processed_count = process_file_to(file_name, file_data, output_buffer, streaming, skip_unchanged, tabular,
+                                      sheet_workers)
+    return output_buffer.getvalue(), processed_count
+
+def process_file_to(file_name, file_data, target, streaming=False, skip_unchanged=True, tabular=False,
+                    sheet_workers=1):
+    """
+    根据文件类型处理文件数据，结果直接写入可定位的文件对象 target
     
-    for file_info in files:
-        if not isinstance(file_info, dict):
-            continue
-            
-        file_name = file_info.get('name', 'unknown_file')
-        
+    :return: 处理数量
+    """
+    if file_name.endswith(('.xlsx', '.xls')):
+        return process_xlsx_stream(_open_source(file_data), target, streaming, skip_unchanged, sheet_workers)
+    
+    if file_name.endswith(('.docx', '.pptx')):
+        return process_office_stream(_open_source(file_data), target, streaming, skip_unchanged)
+    
+    if file_name.endswith(('.txt', '.csv', '.tsv')):
+        if not is_utf8_data(file_data):
+            raise ValueError(f"{file_name} 不是 UTF-8 编码的文本文件")
+        if tabular and file_name.endswith(('.csv', '.tsv')):
+            start = target.tell()
+            try:
+                return process_tabular_stream(_open_source(file_data), target)
+            except csv.Error:
+                # 无法推断分隔符，退回逐字段的流式处理
+                target.seek(start)
+                target.truncate()
+    elif not is_utf8_data(file_data):
+        # 如果不是文本文件，原样写出
+        target.write(file_data)
+        return 0
+    
+    return process_text_stream(_open_source(file_data), target)
+
+def get_output_cache_key(file_name, file_data, options):
+    """输出缓存键：输入内容哈希 + 解析规则版本 + 影响输出的处理选项"""
+    digest = hashlib.sha256(file_data).hexdigest()
+    extension = os.path.splitext(file_name)[1].lower()
+    option_text = '|'.join(f"{key}={options[key]}" for key in sorted(options))
+    variant = f"{PARSER_VERSION}|{extension}|{option_text}"
+    return f"{digest}-{hashlib.sha256(variant.encode('utf-8')).hexdigest()[:16]}"
+
+def load_cached_output(cache_dir, cache_key, file_data):
+    """
+    读取缓存的处理结果，未命中返回None
+    
+    没有日期需要转换的文件只记录元数据，命中时直接返回输入数据。
+    """
+    meta_path = os.path.join(cache_dir, f"{cache_key}.json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('clean'):
+            return file_data, 0
+        with open(os.path.join(cache_dir, f"{cache_key}.bin"), 'rb') as f:
+            return f.read(), meta['processed_count']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_cached_output(cache_dir, cache_key, processed_data, processed_count):
+    """保存处理结果（字节或从当前位置读取的文件对象）；写入失败（如沙箱只读）不影响本次处理"""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        clean = processed_count == 0
+        if not clean:
+            with open(os.path.join(cache_dir, f"{cache_key}.bin"), 'wb') as f:
+                if hasattr(processed_data, 'read'):
+                    shutil.copyfileobj(processed_data, f, RAW_COPY_CHUNK_SIZE)
+                else:
+                    f.write(processed_data)
+        # 元数据最后写入，保证命中时数据文件已完整
+        with open(os.path.join(cache_dir, f"{cache_key}.json"), 'w', encoding='utf-8') as f:
+            json.dump({'processed_count': processed_count, 'clean': clean, 'parser_version': PARSER_VERSION}, f)
+    except OSError:
+        pass
+
+# 输出方式：base64 写入 content；bytes 直接返回原始字节 data；path 写入输出目录，只返回路径和元数据
+OUTPUT_MODES = ('base64', 'bytes', 'path')
+
+# 并发处理的默认线程数，以及同时处理中的文件预估内存总量上限（MB）
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+MEMORY_BUDGET_MB = 512
+# 分块编码 base64 时每次读取的字节数，需为3的倍数，各块编码结果可直接拼接
+BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+def _output_path(output_dir, file_name, index, taken):
+    """输出文件路径：去掉输入名中的目录部分，与已有文件或本批次其他输出重名时加序号"""
+    base_name = f"processed_{os.path.basename(file_name)}"
+    path = os.path.join(output_dir, base_name)
+    if path in taken or os.path.exists(path):
+        stem, extension = os.path.splitext(base_name)
+        path = os.path.join(output_dir, f"{stem}_{index}{extension}")
+    taken.add(path)
+    return path
+
+def estimate_file_size(file_info):
+    """在读取数据之前估算输入文件的字节数"""
+    file_path = file_info.get('path', '')
+    if file_path and os.path.exists(file_path):
+        return os.path.getsize(file_path)
+    content = file_info.get('content', '')
+    if content:
+        return len(content) * 3 // 4
+    return len(file_info.get('data', b''))
+
+def estimate_file_memory(file_name, size, options, output_mode, spool_threshold=None):
+    """
+    估算处理单个文件时的内存峰值（字节）
+    
+    元素树模式下 xlsx 解压并构建整张表的元素树，占用约为压缩大小的数十倍；
+    流式模式和文本文件只需要输入、输出各一份，path 模式下输出直接写入磁盘，
+    溢出到磁盘的临时文件最多在内存中保留 spool_threshold 字节。
+    """
+    if file_name.endswith(('.xlsx', '.xls')) and not options['streaming']:
+        return size * 40
+    copies = 1 if output_mode == 'path' or spool_threshold is not None else 2
+    # base64 文本比原始数据大三分之一
+    if output_mode == 'base64':
+        copies += 1.34
+    memory = int(size * copies)
+    if output_mode != 'path' and spool_threshold is not None:
+        memory += min(size, spool_threshold)
+    return memory
+
+def encode_base64_stream(source, chunk_size=BASE64_CHUNK_SIZE):
+    """从文件对象的当前位置分块编码 base64，不需要先读出完整的原始数据"""
+    encoded = bytearray()
+    for block in iter(lambda: source.read(chunk_size), b''):
+        encoded += base64.b64encode(block)
+    return encoded.decode('ascii')
+
+def get_peak_rss_mb():
+    """当前进程和已结束子进程的峰值内存 (RSS, MB)，不支持的平台返回None"""
+    if resource is None:
+        return None
+    # Linux 下 ru_maxrss 单位为 KB，macOS 下为字节
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1)
+    }
+
+class MemoryBudget:
+    """
+    同时处理中的文件预估内存总量上限
+    
+    acquire 在预算不足时阻塞，直到其他文件处理完成释放；单个文件超过整个预算时，
+    等其他文件全部完成后单独处理，不会永久阻塞。
+    """
+    
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self, amount):
+        with self._condition:
+            while self.used and self.used + amount > self.limit:
+                self._condition.wait()
+            self.used += amount
+    
+    def release(self, amount):
+        with self._condition:
+            self.used -= amount
+            self._condition.notify_all()
+
+def process_file_entry(file_info, options, cache_dir=None, output_mode='base64', output_path=None,
+                       spool_threshold=None):
+    """
+    处理 files 中的一项，返回结果字典
+    
+    单个文件的异常记录在结果的 error 字段中，不影响其他文件。
+    spool_threshold 不为None时，base64/bytes 模式的输出先写入 SpooledTemporaryFile，
+    超过该字节数后转存到磁盘，再从临时文件中分块编码；为0时直接写入磁盘临时文件。
+    """
+    file_name = file_info.get('name', 'unknown_file')
+    file_type = file_info.get('type', 'application/octet-stream')
+    start = time.perf_counter()
+    file_data = None
+    
+    try:
         # 获取文件数据
         file_data = get_file_data(file_info)
         
         if not file_data:
             # 如果无法获取文件数据，返回原文件信息
-            result_files.append({
+            return {
                 'name': f"processed_{file_name}",
                 'error': 'No file data available',
-                'type': file_info.get('type', 'application/octet-stream'),
-                'size': 0
-            })
-            continue
+                'type': file_type,
+                'size': 0,
+                'duration': round(time.perf_counter() - start, 4)
+            }
         
-        processed_data = None
-        processed_count = 0
+        # 内容与解析版本都未变化时直接复用上次的输出
+        cached = None
+        if cache_dir:
+            cache_key = get_output_cache_key(file_name, file_data, options)
+            cached = load_cached_output(cache_dir, cache_key, file_data)
         
-        # 根据文件类型选择处理方法
-        if file_name.endswith(('.xlsx', '.xls')):
-            processed_data, processed_count = process_xlsx_content_memory(file_data)
-        elif file_name.endswith(('.txt', '.csv', '.tsv')):
-            content = file_data.decode('utf-8')
-            processed_content, processed_count = process_text_file_memory(content)
-            processed_data = processed_content.encode('utf-8')
-        else:
-            # 尝试作为文本文件处理
-            try:
-                content = file_data.decode('utf-8')
-                processed_content, processed_count = process_text_file_memory(content)
-                processed_data = processed_content.encode('utf-8')
-            except UnicodeDecodeError:
-                # 如果不是文本文件，直接返回原数据
-                processed_data = file_data
-                processed_count = 0
-        
-        # 将处理后的数据编码为base64（Dify常用格式）
-        processed_base64 = base64.b64encode(processed_data).decode('utf-8')
-        
-        result_files.append({
+        result = {
             'name': f"processed_{file_name}",
-            'content': processed_base64,  # base64编码的内容
-            'type': file_info.get('type', 'application/octet-stream'),
-            'size': len(processed_data),
-            'processed_count': processed_count
+            'type': file_type
+        }
+        
+        if output_mode == 'path':
+            # 直接写入输出文件，不在内存中保留处理结果
+            with open(output_path, 'w+b') as target:
+                if cached is not None:
+                    target.write(cached[0])
+                    processed_count = cached[1]
+                else:
+                    processed_count = process_file_to(file_name, file_data, target, **options)
+                size = target.tell()
+            if cache_dir and cached is None:
+                output_data = map_file(output_path)
+                save_cached_output(cache_dir, cache_key, output_data, processed_count)
+                if isinstance(output_data, mmap.mmap):
+                    output_data.close()
+            result['path'] = output_path
+        elif spool_threshold is not None and cached is None:
+            if spool_threshold:
+                spool = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+            else:
+                # SpooledTemporaryFile 的 max_size=0 表示从不转存，阈值为0时直接写入磁盘临时文件
+                spool = tempfile.TemporaryFile()
+            with spool as target:
+                processed_count = process_file_to(file_name, file_data, target, **options)
+                size = target.tell()
+                if cache_dir:
+                    target.seek(0)
+                    save_cached_output(cache_dir, cache_key, target, processed_count)
+                target.seek(0)
+                if output_mode == 'bytes':
+                    result['data'] = target.read()
+                else:
+                    result['content'] = encode_base64_stream(target)
+        else:
+            if cached is not None:
+                processed_data, processed_count = cached
+            else:
+                processed_data, processed_count = process_file_data(file_name, file_data, **options)
+                if cache_dir:
+                    save_cached_output(cache_dir, cache_key, processed_data, processed_count)
+            
+            size = len(processed_data)
+            if output_mode == 'bytes':
+                # 与输入的 data 字段格式一致；未修改的 mmap 输入需复制出来再关闭映射
+                result['data'] = bytes(processed_data) if isinstance(processed_data, mmap.mmap) else processed_data
+            else:
+                # 将处理后的数据编码为base64（Dify常用格式）
+                result['content'] = base64.b64encode(processed_data).decode('utf-8')
+            processed_data = None
+        
+        result.update({
+            'size': size,
+            'processed_count': processed_count,
+            'cached': cached is not None,
+            'duration': round(time.perf_counter() - start, 4)
         })
+        return result
+    except Exception as e:
+        return {
+            'name': f"processed_{file_name}",
+            'error': str(e),
+            'type': file_type,
+            'size': 0,
+            'duration': round(time.perf_counter() - start, 4)
+        }
+    finally:
+        if isinstance(file_data, mmap.mmap):
+            file_data.close()
+
+def main(files, streaming=False, skip_unchanged=True, cache_dir=None, tabular=False,
+         output_mode='base64', output_dir=None, max_workers=MAX_WORKERS, memory_budget_mb=MEMORY_BUDGET_MB,
+         use_processes=False, sheet_workers=1, spool_threshold_mb=None):
+    """
+    Dify Code Node 主函数 - 修复版本
+    
+    多个文件并发处理，同时处理中的文件预估内存总和不超过 memory_budget_mb，
+    大文件会等待其他文件完成后再开始。结果顺序与输入顺序一致。
+    
+    线程池适合 xlsx（解压缩和文件读写时释放 GIL）；文本解析主要受 GIL 限制，
+    运行环境允许创建子进程时可设置 use_processes=True 使用进程池。
+    
+    :param files: 输入的文件数组
+    :param streaming: 是否以流式方式改写xlsx工作表和docx/pptx文本部件（适合超大文档）
+    :param skip_unchanged: 没有日期变化的工作表是否按原始字节保留
+    :param cache_dir: 输出缓存目录；设置后内容完全相同的输入直接返回上次的结果
+    :param tabular: CSV/TSV 是否使用表格模式（按列推断日期列并整列转换，需要 pandas）
+    :param output_mode: 输出方式，见 OUTPUT_MODES；path 模式不在结果中携带文件内容
+    :param output_dir: path 模式的输出目录，不提供时新建临时目录
+    :param max_workers: 并发处理的线程数，1 表示顺序处理
+    :param memory_budget_mb: 同时处理中的文件预估内存上限（MB）
+    :param use_processes: 是否使用进程池代替线程池
+    :param sheet_workers: 单个 xlsx 内并行改写工作表的进程数，1 表示在当前线程中依次处理；
+                          工作表多而文件少时使用，不能与 use_processes 同时使用
+    :param spool_threshold_mb: 设置后 base64/bytes 模式的输出先写入临时文件，超过该大小（MB）溢出到磁盘，0 表示始终写入磁盘，
+                               与 path 输入的内存映射一起限制处理过程中的内存峰值
+    """
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"不支持的输出方式: {output_mode}")
+    if use_processes and sheet_workers > 1:
+        raise ValueError("use_processes 与 sheet_workers 不能同时使用")
+    
+    options = {'streaming': streaming, 'skip_unchanged': skip_unchanged, 'tabular': tabular,
+               'sheet_workers': sheet_workers}
+    
+    # 检查输入
+    if not files or not isinstance(files, list):
+        return {"result": []}
+    
+    if output_mode == 'path':
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        else:
+            output_dir = tempfile.mkdtemp(prefix='date_parser_')
+    
+    budget = MemoryBudget(memory_budget_mb * 1024 * 1024)
+    spool_threshold = spool_threshold_mb * 1024 * 1024 if spool_threshold_mb is not None else None
+    taken_paths = set()
+    futures = []
+    cache_before = _format_date_cached.cache_info()
+    start = time.perf_counter()
+    
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max(1, max_workers)) as executor:
+        for index, file_info in enumerate(files):
+            if not isinstance(file_info, dict):
+                continue
+            file_name = file_info.get('name', 'unknown_file')
+            output_path = _output_path(output_dir, file_name, index, taken_paths) if output_mode == 'path' else None
+            # 按输入顺序申请内存预算，预算不足时等待前面的文件完成
+            reserved = estimate_file_memory(file_name, estimate_file_size(file_info), options, output_mode,
+                                            spool_threshold)
+            budget.acquire(reserved)
+            future = executor.submit(process_file_entry, file_info, options, cache_dir, output_mode, output_path,
+                                     spool_threshold)
+            future.add_done_callback(lambda _, reserved=reserved: budget.release(reserved))
+            futures.append(future)
     
     return {
-        "result": result_files
-    }
\ No newline at end of file
+        "result": [future.result() for future in futures],
+        "date_cache": get_date_cache_stats(cache_before),
+        "elapsed": round(time.perf_counter() - start, 4),
+        # 用于按沙箱内存大小调整 memory_budget_mb 和 spool_threshold_mb
+        "peak_rss_mb": get_peak_rss_mb()
+    }
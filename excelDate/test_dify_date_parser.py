@@ -0,0 +1,179 @@
+import io
+import zipfile
+
+import pytest
+from openpyxl import Workbook
+
+import dify_date_parser
+
+
+def _build_xlsx():
+    """两张工作表：一张含日期，一张不含；另加一个 STORED 方式的成员"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['日期', '名称'])
+    sheet.append(['2024/1/5', '甲'])
+    sheet.append(['2024年3月8日', '乙'])
+    other = workbook.create_sheet('其他')
+    other.append(['无日期', 123])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    with zipfile.ZipFile(buffer, 'a') as archive:
+        archive.writestr('docProps/custom-stored.bin', b'\x00' * 64, compress_type=zipfile.ZIP_STORED)
+    return buffer.getvalue()
+
+
+def _members(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        return {info.filename: (info.compress_type, archive.read(info)) for info in archive.infolist()}
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_copy_falls_back_without_zipfile_internals(monkeypatch, streaming):
+    source = _build_xlsx()
+    raw_output, raw_count = dify_date_parser.process_xlsx_content_memory(source, streaming=streaming)
+
+    monkeypatch.setattr(dify_date_parser, '_supports_raw_io', lambda zip_file, attrs: False)
+    fallback_output, fallback_count = dify_date_parser.process_xlsx_content_memory(source, streaming=streaming)
+
+    assert raw_count == fallback_count == 2
+    assert _members(fallback_output) == _members(raw_output)
+    assert _members(fallback_output)['docProps/custom-stored.bin'][0] == zipfile.ZIP_STORED
+
+
+def test_raw_copy_keeps_compressed_bytes():
+    source = _build_xlsx()
+    output, _ = dify_date_parser.process_xlsx_content_memory(source)
+    with zipfile.ZipFile(io.BytesIO(source)) as before, zipfile.ZipFile(io.BytesIO(output)) as after:
+        info = before.getinfo('xl/styles.xml')
+        copied = after.getinfo('xl/styles.xml')
+        assert (copied.CRC, copied.compress_size, copied.date_time) == (info.CRC, info.compress_size, info.date_time)
+
+
+def test_sheet_workers_match_serial_streaming_bytes():
+    source = _build_xlsx()
+    serial_output, serial_count = dify_date_parser.process_xlsx_content_memory(source, streaming=True)
+    parallel_output, parallel_count = dify_date_parser.process_xlsx_content_memory(
+        source, streaming=True, sheet_workers=2)
+
+    assert serial_count == parallel_count == 2
+    assert parallel_output == serial_output
+    with zipfile.ZipFile(io.BytesIO(source)) as before, zipfile.ZipFile(io.BytesIO(parallel_output)) as after:
+        for info in before.infolist():
+            assert after.getinfo(info.filename).date_time == info.date_time
+
+
+def test_sheet_workers_read_sheets_in_bounded_batches(monkeypatch):
+    workbook = Workbook()
+    for index in range(8):
+        sheet = workbook.create_sheet(f'表{index}')
+        sheet.append([f'2024/1/{index + 1}', index])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    source = buffer.getvalue()
+    expected, expected_count = dify_date_parser.process_xlsx_content_memory(source, streaming=True)
+
+    in_flight = []
+    peak = []
+    read_member_raw = dify_date_parser._read_member_raw
+    write_member_compressed = dify_date_parser._write_member_compressed
+    copy_member_raw = dify_date_parser._copy_member_raw
+
+    def read_sheet(zip_ref, info):
+        in_flight.append(info.filename)
+        peak.append(len(in_flight))
+        return read_member_raw(zip_ref, info)
+
+    def write_sheet(new_zip, info, *args):
+        in_flight.remove(info.filename)
+        return write_member_compressed(new_zip, info, *args)
+
+    def copy_member(zip_ref, new_zip, info):
+        if info.filename in in_flight:
+            in_flight.remove(info.filename)
+        return copy_member_raw(zip_ref, new_zip, info)
+
+    monkeypatch.setattr(dify_date_parser, '_read_member_raw', read_sheet)
+    monkeypatch.setattr(dify_date_parser, '_write_member_compressed', write_sheet)
+    monkeypatch.setattr(dify_date_parser, '_copy_member_raw', copy_member)
+    output, count = dify_date_parser.process_xlsx_content_memory(source, streaming=True, sheet_workers=2)
+
+    assert (output, count) == (expected, expected_count)
+    assert len(peak) == 9
+    assert max(peak) == 2 * dify_date_parser.SHEETS_IN_FLIGHT_PER_WORKER
+    assert not in_flight
+
+
+def test_sheet_workers_fall_back_without_zipfile_internals(monkeypatch):
+    source = _build_xlsx()
+    expected, _ = dify_date_parser.process_xlsx_content_memory(source, streaming=True, sheet_workers=2)
+
+    monkeypatch.setattr(dify_date_parser, '_supports_raw_io', lambda zip_file, attrs: False)
+    output, count = dify_date_parser.process_xlsx_content_memory(source, streaming=True, sheet_workers=2)
+
+    assert count == 2
+    assert _members(output) == _members(expected)
+
+
+def test_office_text_skips_version_numbers():
+    from docx import Document
+
+    document = Document()
+    document.add_paragraph('版本 v2024.1.3 发布，于2024年3月8日上线。')
+    buffer = io.BytesIO()
+    document.save(buffer)
+
+    output = io.BytesIO()
+    count = dify_date_parser.process_office_stream(io.BytesIO(buffer.getvalue()), output)
+
+    assert count == 1
+    assert Document(output).paragraphs[0].text == '版本 v2024.1.3 发布，于2024-03-08 00:00:00上线。'
+
+
+@pytest.mark.parametrize('process', [dify_date_parser.process_text_stream, dify_date_parser.process_tabular_stream])
+def test_csv_converts_full_width_digit_dates(process):
+    source = '日期,名称\n２０２４/１/５,甲\n２０２４年３月８日,乙\n'.encode('utf-8')
+
+    output = io.BytesIO()
+    count = process(io.BytesIO(source), output)
+
+    assert count == 2
+    assert output.getvalue().decode('utf-8') == '日期,名称\n2024-01-05 00:00:00,甲\n2024-03-08 00:00:00,乙\n'
+
+
+def test_date_cache_skips_non_dates_and_reports_run_deltas():
+    before = dify_date_parser._format_date_cached.cache_info()
+    assert dify_date_parser.format_chinese_date('备注：不是日期的长文本') is None
+    assert dify_date_parser._format_date_cached.cache_info() == before
+
+    dify_date_parser.format_chinese_date('1987/6/15')
+    dify_date_parser.format_chinese_date(' 1987/6/15 ')
+    stats = dify_date_parser.get_date_cache_stats(before)
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_office_rewritten_parts_keep_member_metadata(streaming):
+    from docx import Document
+
+    document = Document()
+    document.add_paragraph('于2024年3月8日上线。')
+    buffer = io.BytesIO()
+    document.save(buffer)
+    source = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as archive, \
+            zipfile.ZipFile(source, 'w', zipfile.ZIP_DEFLATED) as rebuilt:
+        for info in archive.infolist():
+            member = zipfile.ZipInfo(info.filename, date_time=(2001, 2, 3, 4, 5, 6))
+            member.external_attr = 0o100644 << 16
+            rebuilt.writestr(member, archive.read(info), compress_type=zipfile.ZIP_DEFLATED)
+
+    output = io.BytesIO()
+    count = dify_date_parser.process_office_stream(io.BytesIO(source.getvalue()), output, streaming=streaming)
+
+    assert count == 1
+    with zipfile.ZipFile(output) as archive:
+        info = archive.getinfo('word/document.xml')
+        assert info.date_time == (2001, 2, 3, 4, 5, 6)
+        assert info.external_attr == 0o100644 << 16
@@ -0,0 +1,151 @@
+import re
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+# 每批内容的默认 token 上限，需为提示词和模型输出留出余量
+MAX_BATCH_TOKENS = 6000
+# 并发处理的批次数上限
+MAX_CONCURRENCY = 4
+
+# 中日韩文字和全角标点大约每字一个 token，其他字符大约每 4 个一个 token
+_WIDE_CHAR = re.compile(r'[⺀-鿿가-힯豈-﫿＀-￯]')
+# LLM 输出外层可能带有 ```json 代码块
+_CODE_FENCE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+def estimate_tokens(text):
+    """粗略估算文本的 token 数，不依赖具体模型的分词器"""
+    if not text:
+        return 0
+    wide = len(_WIDE_CHAR.findall(text))
+    return wide + math.ceil((len(text) - wide) / 4)
+
+def item_tokens(item):
+    """内容项在提示词中占用的 token 数，按其 JSON 序列化后的文本估算"""
+    return estimate_tokens(json.dumps(item, ensure_ascii=False))
+
+def iter_content_items(content):
+    """产出逐项的内容项；Excel 的列式结构（format 为 columnar）按单元格展开"""
+    if isinstance(content, dict) and content.get('format') == 'columnar':
+        values = content['values']
+        for sheet in content['sheets']:
+            sheet_name = sheet['name']
+            for row_idx, col_idx, value_id in zip(sheet['rows'], sheet['cols'], sheet['value_ids']):
+                yield {
+                    'type': 'cell',
+                    'content': values[value_id],
+                    'position': f'sheet_{sheet_name}_row_{row_idx}_col_{col_idx}'
+                }
+        return
+    yield from content
+
+def pack_batches(content, max_tokens=MAX_BATCH_TOKENS, count_tokens=item_tokens):
+    """
+    按 token 上限把内容项依次装入批次，不拆分单个内容项
+
+    超过上限的单个内容项单独成为一批。
+
+    :param content: 文档解析节点输出的 content
+    :param count_tokens: 估算单个内容项 token 数的函数，可换成具体模型的分词器
+    :return: [{'items': [...], 'tokens': 估算的 token 数}, ...]
+    """
+    batches = []
+    items = []
+    tokens = 0
+    for item in iter_content_items(content):
+        cost = count_tokens(item)
+        if items and tokens + cost > max_tokens:
+            batches.append({'items': items, 'tokens': tokens})
+            items, tokens = [], 0
+        items.append(item)
+        tokens += cost
+    if items:
+        batches.append({'items': items, 'tokens': tokens})
+    return batches
+
+def run_batches(batches, handler, max_concurrency=MAX_CONCURRENCY):
+    """
+    并发处理所有批次，返回值与 batches 一一对应
+
+    :param handler: 处理单个批次内容项列表的函数，如调用 LLM 的请求
+    """
+    if not batches:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as executor:
+        return list(executor.map(handler, (batch['items'] for batch in batches)))
+
+def _load_result(result):
+    """
+    解析单个批次的输出：JSON 字符串（可带代码块）或已解析的列表
+
+    :raises ValueError: 不是合法 JSON，或解析结果不是由对象组成的列表（JSONDecodeError 是其子类）
+    """
+    if isinstance(result, str):
+        result = result.strip()
+        if not result:
+            return []
+        result = json.loads(_CODE_FENCE.sub('', result))
+    if isinstance(result, dict):
+        result = [result]
+    result = result or []
+    if not isinstance(result, list) or not all(isinstance(entry, dict) for entry in result):
+        raise ValueError("批次输出不是对象列表")
+    return result
+
+def merge_results(batch_results, content=None):
+    """
+    按 position 合并各批次的输出
+
+    完全相同的结果只保留一个；有原始 content 时按 position 在文档中的顺序排列，
+    同一位置的多个结果保持批次内的先后顺序，不在文档中的位置排在最后。
+    与批次完成的先后无关，同样的输入总是得到同样的输出。
+    无法解析的批次跳过，其余批次照常合并。
+
+    :return: (合并后的结果, 解析失败的批次下标列表)，失败的批次可以重新处理
+    """
+    order = {}
+    for item in iter_content_items(content or []):
+        order.setdefault(item.get('position'), len(order))
+
+    seen = set()
+    merged = []
+    failed = []
+    for batch_idx, result in enumerate(batch_results):
+        try:
+            entries = _load_result(result)
+        except ValueError:
+            failed.append(batch_idx)
+            continue
+        for entry in entries:
+            key = json.dumps(entry, ensure_ascii=False, sort_keys=True)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(entry)
+    # sorted 是稳定排序，同一位置的结果保持原有顺序
+    return sorted(merged, key=lambda entry: order.get(entry.get('position'), len(order))), failed
+
+def main(inputs):
+    # split：把文档解析节点的 content 分批，供迭代节点并行调用 LLM；
+    # merge：把迭代节点收集到的各批次输出按 position 合并
+    mode = inputs.get('mode', 'split')
+    content = inputs.get('content', [])
+    if isinstance(content, str):
+        content = json.loads(content)
+
+    if mode == 'merge':
+        results, failed_batches = merge_results(inputs.get('batch_results', []), content)
+        return {
+            'result': results,
+            'result_count': len(results),
+            # 输出无法解析的批次下标，与 split 输出的 batches 对应，可据此重试
+            'failed_batches': failed_batches
+        }
+
+    batches = pack_batches(content, int(inputs.get('max_tokens') or MAX_BATCH_TOKENS))
+    return {
+        # 每批序列化为 JSON 字符串，迭代节点可直接填入提示词
+        'batches': [json.dumps(batch['items'], ensure_ascii=False) for batch in batches],
+        'batch_tokens': [batch['tokens'] for batch in batches],
+        'batch_count': len(batches)
+    }
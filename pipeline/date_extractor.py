@@ -0,0 +1,257 @@
+import re
+import calendar
+import datetime
+
+# 英文月份名称（含常见缩写）到月份数字
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+}
+_MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+# 可选的时间部分：14:30、2:30:15、2:30 PM、8时11分
+_TIME = (
+    r'(?:[ T]+(?P<{p}hour>\d{{1,2}}):(?P<{p}minute>\d{{2}})(?::(?P<{p}second>\d{{2}}))?'
+    r'(?:\s*(?P<{p}ampm>[AaPp]\.?[Mm]\.?))?'
+    r'|\s*(?P<{p}cn_hour>\d{{1,2}})[时点](?:(?P<{p}cn_minute>\d{{1,2}})分(?:(?P<{p}cn_second>\d{{1,2}})秒)?)?)?'
+)
+
+# 中文相对日期
+_CN_NUMBERS = {'一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
+_RELATIVE_WORDS = {
+    '大前天': ('day', -3), '前天': ('day', -2), '昨天': ('day', -1), '今天': ('day', 0),
+    '明天': ('day', 1), '后天': ('day', 2), '大后天': ('day', 3),
+    '上周': ('week', -1), '本周': ('week', 0), '这周': ('week', 0), '下周': ('week', 1),
+    '上个月': ('month', -1), '本月': ('month', 0), '这个月': ('month', 0), '下个月': ('month', 1),
+    '去年': ('year', -1), '今年': ('year', 0), '明年': ('year', 1)
+}
+_RELATIVE_UNITS = {'天': 'day', '日': 'day', '周': 'week', '星期': 'week', '个月': 'month', '年': 'year'}
+
+# 数字日期前紧跟“数字+同一分隔符”时，是编号、电话等更长数字串的一部分，不作为日期；
+# 分隔符不同时（如日期区间 2023.12.05-2023.12.07）不受影响
+_SEP_BOUNDARY = r'(?:(?<!\d-)(?=\d+-)|(?<!\d/)(?=\d+/)|(?<!\d\.)(?=\d+\.))'
+
+# 所有格式合并为一个正则，每段文本只扫描一次；分组名前缀区分匹配到的格式
+DATE_PATTERN = re.compile(
+    # 2023-12-05、2023/12/05、2023.12.05
+    r'(?<!\d)' + _SEP_BOUNDARY +
+    r'(?P<ymd_year>\d{4})(?P<ymd_sep>[-/.])(?P<ymd_month>\d{1,2})(?P=ymd_sep)(?P<ymd_day>\d{1,2})(?!\d)(?!(?P=ymd_sep)\d)'
+    + _TIME.format(p='ymd_') +
+    # 2023年12月5日
+    r'|(?<!\d)(?P<cn_year>\d{4})年(?P<cn_month>\d{1,2})月(?P<cn_day>\d{1,2})[日号]'
+    + _TIME.format(p='cn_') +
+    # 05/12/2023、05-12-2023（日月顺序可能有歧义）
+    r'|(?<!\d)' + _SEP_BOUNDARY +
+    r'(?P<dmy_a>\d{1,2})(?P<dmy_sep>[-/.])(?P<dmy_b>\d{1,2})(?P=dmy_sep)(?P<dmy_year>\d{4})(?!\d)(?!(?P=dmy_sep)\d)'
+    + _TIME.format(p='dmy_') +
+    # Jan 5, 2023、January 5th 2023
+    r'|\b(?P<mdy_month>' + _MONTH_NAMES + r')\.?\s+(?P<mdy_day>\d{1,2})(?:st|nd|rd|th)?,?\s+(?P<mdy_year>\d{4})(?!\d)'
+    + _TIME.format(p='mdy_') +
+    # 5 January 2023、5th Jan, 2023
+    r'|\b(?P<dmy_en_day>\d{1,2})(?:st|nd|rd|th)?\s+(?P<dmy_en_month>' + _MONTH_NAMES + r')\.?,?\s+(?P<dmy_en_year>\d{4})(?!\d)'
+    + _TIME.format(p='dmy_en_') +
+    # 3天前、两个月后、十二个月后；前面紧跟数字时不匹配，避免把十二个月后拆成二个月后，
+    # "第"开头的是序数而不是相对日期
+    r'|(?<![\d一二两三四五六七八九十百千零〇第])'
+    r'(?P<rel_count>\d{1,3}|[二三四五六七八九]?十[一二三四五六七八九]?|[一二两三四五六七八九])(?P<rel_unit>天|日|周|星期|个月|年)(?P<rel_direction>前|后|以前|以后)'
+    # 昨天、下个月
+    r'|(?P<rel_word>' + '|'.join(sorted(_RELATIVE_WORDS, key=len, reverse=True)) + r')',
+    re.IGNORECASE
+)
+
+def _time_format(match, prefix):
+    """根据匹配到的时间部分生成格式后缀"""
+    if match.group(prefix + 'hour'):
+        hour_format = 'hh' if match.group(prefix + 'ampm') else 'HH'
+        time_format = f' {hour_format}:mm'
+        if match.group(prefix + 'second'):
+            time_format += ':ss'
+        if match.group(prefix + 'ampm'):
+            time_format += ' a'
+        return time_format
+    if match.group(prefix + 'cn_hour'):
+        time_format = 'HH时'
+        if match.group(prefix + 'cn_minute'):
+            time_format += 'mm分'
+        if match.group(prefix + 'cn_second'):
+            time_format += 'ss秒'
+        return time_format
+    return ''
+
+def _time_valid(match, prefix):
+    """检查时间部分是否合法"""
+    hour = match.group(prefix + 'hour') or match.group(prefix + 'cn_hour')
+    if hour is None:
+        return True
+    minute = match.group(prefix + 'minute') or match.group(prefix + 'cn_minute') or 0
+    second = match.group(prefix + 'second') or match.group(prefix + 'cn_second') or 0
+    max_hour = 12 if match.group(prefix + 'ampm') else 23
+    return int(hour) <= max_hour and int(minute) <= 59 and int(second) <= 59
+
+def _date_valid(year, month, day):
+    try:
+        datetime.date(int(year), int(month), int(day))
+        return True
+    except ValueError:
+        return False
+
+def shift_date(reference, unit, amount):
+    """以参考日期为基准按天、周、月、年偏移，月末日期按目标月份的天数截断"""
+    if unit == 'day':
+        return reference + datetime.timedelta(days=amount)
+    if unit == 'week':
+        return reference + datetime.timedelta(weeks=amount)
+    if unit == 'month':
+        month_index = reference.month - 1 + amount
+        year, month = reference.year + month_index // 12, month_index % 12 + 1
+    else:
+        year, month = reference.year + amount, reference.month
+    day = min(reference.day, calendar.monthrange(year, month)[1])
+    return reference.replace(year=year, month=month, day=day)
+
+def _cn_count(text):
+    """中文数字转换为整数，支持一至九十九：五、十、十二、二十、三十五"""
+    tens, ten, ones = text.partition('十')
+    if not ten:
+        return _CN_NUMBERS[text]
+    return (_CN_NUMBERS[tens] if tens else 1) * 10 + (_CN_NUMBERS[ones] if ones else 0)
+
+def _relative_date(match, reference):
+    """计算相对日期，返回 datetime.date"""
+    word = match.group('rel_word')
+    if word:
+        unit, amount = _RELATIVE_WORDS[word]
+    else:
+        count = match.group('rel_count')
+        amount = int(count) if count.isdigit() else _cn_count(count)
+        unit = _RELATIVE_UNITS[match.group('rel_unit')]
+        if match.group('rel_direction').endswith('前'):
+            amount = -amount
+    return shift_date(reference, unit, amount)
+
+def match_date(match, reference):
+    """
+    把一个正则匹配转换为日期信息，不是合法日期时返回None
+
+    :return: (possible_formats, 相对日期的解析结果或None)
+    """
+    if match.group('ymd_year'):
+        if not _date_valid(match.group('ymd_year'), match.group('ymd_month'), match.group('ymd_day')) \
+                or not _time_valid(match, 'ymd_'):
+            return None
+        sep = match.group('ymd_sep')
+        return [f'yyyy{sep}mm{sep}dd' + _time_format(match, 'ymd_')], None
+
+    if match.group('cn_year'):
+        if not _date_valid(match.group('cn_year'), match.group('cn_month'), match.group('cn_day')) \
+                or not _time_valid(match, 'cn_'):
+            return None
+        return ['yyyy年mm月dd日' + _time_format(match, 'cn_')], None
+
+    if match.group('dmy_year'):
+        if not _time_valid(match, 'dmy_'):
+            return None
+        sep = match.group('dmy_sep')
+        year, first, second = match.group('dmy_year'), match.group('dmy_a'), match.group('dmy_b')
+        time_format = _time_format(match, 'dmy_')
+        formats = []
+        if _date_valid(year, second, first):
+            formats.append(f'dd{sep}mm{sep}yyyy' + time_format)
+        if _date_valid(year, first, second) and first != second:
+            formats.append(f'mm{sep}dd{sep}yyyy' + time_format)
+        return (formats, None) if formats else None
+
+    if match.group('mdy_year'):
+        month_name = match.group('mdy_month').lower()
+        if not _date_valid(match.group('mdy_year'), MONTHS[month_name], match.group('mdy_day')) \
+                or not _time_valid(match, 'mdy_'):
+            return None
+        month_format = 'MMM' if len(month_name) <= 4 and month_name not in ('june', 'july') else 'MMMM'
+        return [f'{month_format} dd, yyyy' + _time_format(match, 'mdy_')], None
+
+    if match.group('dmy_en_year'):
+        month_name = match.group('dmy_en_month').lower()
+        if not _date_valid(match.group('dmy_en_year'), MONTHS[month_name], match.group('dmy_en_day')) \
+                or not _time_valid(match, 'dmy_en_'):
+            return None
+        month_format = 'MMM' if len(month_name) <= 4 and month_name not in ('june', 'july') else 'MMMM'
+        return [f'dd {month_format} yyyy' + _time_format(match, 'dmy_en_')], None
+
+    return ['relative'], _relative_date(match, reference)
+
+def extract_text_dates(text, reference):
+    """
+    提取一段文本中的所有日期
+
+    :return: [(原文, possible_formats, 相对日期的解析结果或None), ...]
+    """
+    found = []
+    for match in DATE_PATTERN.finditer(text):
+        matched = match_date(match, reference)
+        if matched is not None:
+            found.append((match.group(0),) + matched)
+    return found
+
+def _iter_text_items(content):
+    """
+    产出 (文本, 位置标识生成函数)
+
+    逐项列表中每项对应一段文本；Excel 的列式结构（format 为 columnar）中
+    重复的单元格文本只产出一次，位置在找到日期后才展开。
+    """
+    if isinstance(content, dict) and content.get('format') == 'columnar':
+        positions = {}
+        for sheet in content['sheets']:
+            sheet_name = sheet['name']
+            for row_idx, col_idx, value_id in zip(sheet['rows'], sheet['cols'], sheet['value_ids']):
+                positions.setdefault(value_id, []).append(f'sheet_{sheet_name}_row_{row_idx}_col_{col_idx}')
+        for value_id, text in enumerate(content['values']):
+            if value_id in positions:
+                yield text, positions[value_id]
+        return
+
+    for item in content:
+        yield item.get('content'), [item.get('position')]
+
+def extract_dates(content, reference=None):
+    """
+    从 document_parser 输出的 content 中提取日期
+
+    :param content: [{'content': 文本, 'position': 位置标识}, ...]，或 Excel 的列式结构
+    :param reference: 相对日期的参考日期（datetime.date），默认今天
+    :return: extracted_dates 列表，与日期格式化节点的输入格式一致；
+             列式结构的结果按单元格文本分组，而不是按单元格顺序排列
+    """
+    reference = reference or datetime.date.today()
+    extracted_dates = []
+
+    for text, positions in _iter_text_items(content):
+        if not text:
+            continue
+        for original_text, possible_formats, resolved in extract_text_dates(text, reference):
+            for position in positions:
+                date_info = {
+                    'original_text': original_text,
+                    'position': position,
+                    'possible_formats': possible_formats
+                }
+                if resolved is not None:
+                    # 相对日期无法从原文解析，附带按参考日期计算的结果
+                    date_info['resolved_date'] = resolved.strftime('%Y-%m-%d 00:00:00')
+                extracted_dates.append(date_info)
+
+    return extracted_dates
+
+def main(inputs):
+    # 获取文档解析节点的输出，以及可选的参考日期（yyyy-mm-dd）
+    content = inputs.get('content', [])
+    reference_date = inputs.get('reference_date')
+    reference = datetime.datetime.strptime(reference_date, '%Y-%m-%d').date() if reference_date else None
+
+    extracted_dates = extract_dates(content, reference)
+    return {
+        'extracted_dates': extracted_dates,
+        'date_count': len(extracted_dates)
+    }
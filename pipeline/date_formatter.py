@@ -1,24 +1,132 @@
+import re
+import time
 import datetime
+from functools import lru_cache
 import dateutil.parser
 from dateutil.tz import tzlocal
 
-def format_date(original_text, possible_formats):
-    """将日期字符串格式化为yyyy-MM-dd hh:mm:ss格式"""
+# 英文月份名称（含常见缩写）到月份数字
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+}
+
+# possible_formats 中的格式记号，按长度优先匹配
+_FORMAT_TOKEN = re.compile(r'yyyy|YYYY|MMMM|MMM|MM|mm|M|m|dd|DD|d|D|HH|hh|H|h|ss|s|a|A|\s+|.')
+
+def _token_pattern(token, in_time):
+    """单个格式记号对应的正则片段；mm 在小时之后表示分钟，否则表示月份"""
+    if token in ('yyyy', 'YYYY'):
+        return r'(?P<year>\d{4})'
+    if token in ('MMMM', 'MMM'):
+        return r'(?P<month_name>[A-Za-z]+)\.?'
+    if token in ('MM', 'M') or (token in ('mm', 'm') and not in_time):
+        return r'(?P<month>\d{1,2})'
+    if token in ('mm', 'm'):
+        return r'(?P<minute>\d{1,2})'
+    if token in ('dd', 'DD', 'd', 'D'):
+        return r'(?P<day>\d{1,2})(?:st|nd|rd|th)?'
+    if token in ('HH', 'hh', 'H', 'h'):
+        return r'(?P<hour>\d{1,2})'
+    if token in ('ss', 's'):
+        return r'(?P<second>\d{1,2})'
+    if token in ('a', 'A'):
+        return r'(?P<ampm>[AaPp])\.?[Mm]\.?'
+    if token.isspace():
+        return ''
+    if token == ',':
+        return r',?'
+    return re.escape(token)
+
+@lru_cache(maxsize=256)
+def compile_format(date_format):
+    """
+    把 possible_formats 中的格式（如 "dd/mm/yyyy hh:mm a"）编译为正则，按格式字符串缓存
+
+    :return: (编译后的正则, 日月顺序)，无法识别的格式返回 (None, None)。
+             日月顺序只对年份在后的纯数字格式有意义，取值 'dmy' 或 'mdy'；
+             年份在前或月份为英文名称的格式没有歧义，记为 None
+    """
+    parts = []
+    fields = []
+    in_time = False
+    for token in _FORMAT_TOKEN.findall(date_format):
+        piece = _token_pattern(token, in_time)
+        if not piece:
+            continue
+        if piece.startswith('(?P<'):
+            field = piece[4:piece.index('>')]
+            if field in fields:
+                # 同一字段重复出现，不是合法的日期格式
+                return None, None
+            fields.append(field)
+            in_time = in_time or field == 'hour'
+        parts.append(piece)
+    if 'year' not in fields or 'day' not in fields or not ('month' in fields or 'month_name' in fields):
+        return None, None
+
+    # 各部分之间允许任意空白，兼容 "2023年12月5日 8时30分" 这类写法
+    pattern = re.compile(r'\s*' + r'\s*'.join(parts) + r'\s*', re.IGNORECASE)
+    if 'month' not in fields or fields.index('year') < fields.index('day'):
+        return pattern, None
+    return pattern, 'dmy' if fields.index('day') < fields.index('month') else 'mdy'
+
+def parse_with_format(original_text, date_format):
+    """按指定格式解析日期，不匹配或日期不合法时返回None"""
+    pattern, _ = compile_format(date_format)
+    if pattern is None:
+        return None
+    match = pattern.fullmatch(original_text)
+    if not match:
+        return None
+
+    fields = match.groupdict()
+    if fields.get('month_name'):
+        month = MONTHS.get(fields['month_name'].lower())
+        if month is None:
+            return None
+    else:
+        month = int(fields['month'])
+    hour = int(fields.get('hour') or 0)
+    if fields.get('ampm'):
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if fields['ampm'].lower() == 'p' else 0)
     try:
-        # 尝试使用dateutil自动解析
-        parsed_date = dateutil.parser.parse(original_text, fuzzy=True)
-        
-        # 如果没有时间信息，添加默认时间00:00:00
-        if parsed_date.hour == 0 and parsed_date.minute == 0 and parsed_date.second == 0:
-            formatted_date = parsed_date.strftime("%Y-%m-%d 00:00:00")
-        else:
-            formatted_date = parsed_date.strftime("%Y-%m-%d %H:%M:%S")
-            
-        return {
-            "original_text": original_text,
-            "formatted_text": formatted_date,
-            "status": "success"
-        }
+        return datetime.datetime(int(fields['year']), month, int(fields['day']), hour,
+                                 int(fields.get('minute') or 0), int(fields.get('second') or 0))
+    except (TypeError, ValueError):
+        return None
+
+def _match_formats(original_text, possible_formats):
+    """
+    依次尝试 possible_formats 中的格式
+
+    :return: {日月顺序: datetime}
+    """
+    matches = {}
+    for date_format in possible_formats or []:
+        parsed = parse_with_format(original_text, date_format)
+        if parsed is not None:
+            _, order = compile_format(date_format)
+            matches.setdefault(order, parsed)
+    return matches
+
+def _format_result(original_text, parsed_date):
+    # 没有时间信息时输出 00:00:00
+    return {
+        "original_text": original_text,
+        "formatted_text": parsed_date.strftime("%Y-%m-%d %H:%M:%S"),
+        "status": "success"
+    }
+
+def _fallback_parse(original_text, dayfirst=False):
+    """格式全部不匹配时使用 dateutil 模糊解析"""
+    try:
+        parsed_date = dateutil.parser.parse(original_text, fuzzy=True, dayfirst=dayfirst)
+        return _format_result(original_text, parsed_date)
     except Exception as e:
         return {
             "original_text": original_text,
@@ -27,22 +135,91 @@ def format_date(original_text, possible_formats):
             "error": str(e)
         }
 
-def main(inputs):
-    # 获取提取的日期列表
-    extracted_dates = inputs.get('extracted_dates', [])
-    
-    # 格式化每个日期
+def _pick_match(matches, dayfirst):
+    """两种日月顺序都能解析时按 dayfirst 选择，否则使用唯一的结果"""
+    if 'dmy' in matches and 'mdy' in matches:
+        return matches['dmy' if dayfirst else 'mdy']
+    return next(iter(matches.values()))
+
+def format_date(original_text, possible_formats, dayfirst=False):
+    """将日期字符串格式化为yyyy-MM-dd hh:mm:ss格式"""
+    matches = _match_formats(original_text, possible_formats)
+    if matches:
+        return _format_result(original_text, _pick_match(matches, dayfirst))
+    return _fallback_parse(original_text, dayfirst)
+
+def resolve_dayfirst(matched_items):
+    """
+    根据文档中没有歧义的日期判断整篇文档的日月顺序
+
+    只能按 dd/mm 或只能按 mm/dd 解析的日期各投一票，票数多的顺序用于所有有歧义的日期；
+    平票或没有可参考的日期时与 dateutil 默认一致，按 mm/dd 处理。
+    """
+    day_votes = sum(1 for matches in matched_items if 'dmy' in matches and 'mdy' not in matches)
+    month_votes = sum(1 for matches in matched_items if 'mdy' in matches and 'dmy' not in matches)
+    return day_votes > month_votes
+
+def format_dates(extracted_dates, dayfirst=None):
+    """
+    批量格式化整篇文档提取出的日期
+
+    先用 possible_formats 对应的预编译格式解析全部日期，再根据没有歧义的日期统一决定
+    日月顺序，最后只对格式全部不匹配的日期调用 dateutil。
+
+    :param extracted_dates: 日期提取节点输出的列表
+    :param dayfirst: 指定日月顺序；None 表示根据文档内容推断
+    :return: (formatted_dates, 统计信息)
+    """
+    start = time.perf_counter()
+    matched_items = [
+        {} if date_info.get('resolved_date') else
+        _match_formats(date_info.get('original_text') or '', date_info.get('possible_formats', []))
+        for date_info in extracted_dates
+    ]
+    if dayfirst is None:
+        dayfirst = resolve_dayfirst(matched_items)
+
     formatted_dates = []
-    for date_info in extracted_dates:
-        formatted = format_date(
-            date_info.get('original_text'),
-            date_info.get('possible_formats', [])
-        )
+    fallback_count = 0
+    for date_info, matches in zip(extracted_dates, matched_items):
+        original_text = date_info.get('original_text')
+        if date_info.get('resolved_date'):
+            # 相对日期（如 昨天、下个月）已由日期提取节点按参考日期计算
+            formatted = {
+                "original_text": original_text,
+                "formatted_text": date_info['resolved_date'],
+                "status": "success"
+            }
+        elif matches:
+            formatted = _format_result(original_text, _pick_match(matches, dayfirst))
+        else:
+            fallback_count += 1
+            formatted = _fallback_parse(original_text, dayfirst)
         # 添加位置信息
         formatted['position'] = date_info.get('position')
         formatted_dates.append(formatted)
-    
+
+    elapsed = time.perf_counter() - start
+    total = len(extracted_dates)
+    stats = {
+        'total': total,
+        'fallback_count': fallback_count,
+        'fallback_rate': round(fallback_count / total, 4) if total else 0.0,
+        'dayfirst': dayfirst,
+        'elapsed': round(elapsed, 6),
+        'dates_per_second': round(total / elapsed, 1) if elapsed else None
+    }
+    return formatted_dates, stats
+
+def main(inputs):
+    # 获取提取的日期列表，可选指定日月顺序（不指定时按文档内容推断）
+    extracted_dates = inputs.get('extracted_dates', [])
+    dayfirst = inputs.get('dayfirst')
+
+    formatted_dates, stats = format_dates(extracted_dates, dayfirst)
+
     return {
         'formatted_dates': formatted_dates,
-        'failed_count': sum(1 for d in formatted_dates if d['status'] == 'failed')
+        'failed_count': sum(1 for d in formatted_dates if d['status'] == 'failed'),
+        'stats': stats
     }
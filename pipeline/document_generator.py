@@ -1,14 +1,74 @@
+import io
 import os
+import re
+import copy
+import base64
+import shutil
+import struct
+import zipfile
+import posixpath
 import tempfile
+from lxml import etree
 from docx import Document
 from openpyxl import Workbook
 from pptx import Presentation
 import json
 
+# 位置索引项 [类型, 各字段...] 的字段名，与文档解析节点的 position_entry 一致
+POSITION_FIELDS = {
+    'paragraph': ('index', 'paragraph'),
+    'cell': ('sheet', 'row', 'col'),
+    'shape': ('slide', 'shape')
+}
+
+# 没有位置索引时从 position 字符串还原位置；工作表名可以包含下划线
+_POSITION_PATTERNS = (
+    ('cell', re.compile(r'sheet_(.*)_row_(\d+)_col_(\d+)')),
+    ('shape', re.compile(r'slide_(\d+)_shape_(\d+)')),
+    ('paragraph', re.compile(r'paragraph_(\d+)'))
+)
+
+def parse_position(position):
+    """
+    从 position 字符串还原位置项，无法识别时返回None
+
+    段落只能还原非空段落的序号，在文档所有段落中的下标未知，记为None。
+    """
+    for kind, pattern in _POSITION_PATTERNS:
+        match = pattern.fullmatch(position or '')
+        if match:
+            if kind == 'cell':
+                return ('cell', match.group(1), int(match.group(2)), int(match.group(3)))
+            if kind == 'shape':
+                return ('shape', int(match.group(1)), int(match.group(2)))
+            return ('paragraph', int(match.group(1)), None)
+    return None
+
+class PositionIndex:
+    """
+    position 字符串到源文档位置的索引
+
+    由文档解析节点输出的 position_index 构建，每次查找 O(1)；
+    索引中缺少的位置退回解析字符串，结果同样缓存。
+    """
+
+    def __init__(self, entries=None):
+        self._entries = {position: tuple(entry) for position, entry in (entries or {}).items()}
+
+    def lookup(self, position):
+        """返回 (类型, 各字段...)，无法识别时返回None"""
+        entry = self._entries.get(position)
+        if entry is None:
+            entry = self._entries[position] = parse_position(position)
+        return entry
+
+def _load_json(content):
+    return json.loads(content) if isinstance(content, str) else content
+
 def generate_docx(original_content, modified_content):
     """生成修改后的Word文档"""
     doc = Document()
-    modified_data = json.loads(modified_content)
+    modified_data = _load_json(modified_content)
     
     # 简单重建文档（实际应用中可能需要更复杂的格式保留逻辑）
     for item in modified_data:
@@ -28,31 +88,41 @@ def generate_docx(original_content, modified_content):
     os.unlink(temp_file_path)
     return file_content
 
-def generate_xlsx(original_content, modified_content):
-    """生成修改后的Excel文档"""
-    wb = Workbook()
-    ws = wb.active
-    modified_data = json.loads(modified_content)
+def iter_modified_cells(modified_data, position_index=None):
+    """
+    产出待写入的单元格 (工作表名, 行号, 列号, 内容)，行列号从0开始
+
+    同时支持逐项的内容列表和文档解析节点的列式结构（format 为 columnar）。
+    """
+    position_index = position_index or PositionIndex()
+    if isinstance(modified_data, dict) and modified_data.get('format') == 'columnar':
+        values = modified_data['values']
+        for sheet in modified_data['sheets']:
+            sheet_name = sheet['name']
+            for row, col, value_id in zip(sheet['rows'], sheet['cols'], sheet['value_ids']):
+                yield sheet_name, row, col, values[value_id]
+        return
     
-    # 构建单元格位置到内容的映射
-    cell_map = {}
     for item in modified_data:
         if item['type'] == 'cell':
-            parts = item['position'].split('_')
-            sheet_name = parts[1]
-            row = int(parts[3]) + 1  # Excel行号从1开始
-            col = int(parts[5]) + 1  # Excel列号从1开始
-            cell_map[(sheet_name, row, col)] = item['content']
-    
-    # 确保工作表存在
-    if 'sheet_1' not in wb.sheetnames:
-        wb.create_sheet('1')
-    ws = wb['1']
-    
-    # 填充数据
-    for (sheet, row, col), content in cell_map.items():
-        if sheet == '1':  # 简化处理，仅处理第一个工作表
-            ws.cell(row=row, column=col, value=content)
+            entry = position_index.lookup(item['position'])
+            if entry is not None and entry[0] == 'cell':
+                yield entry[1], entry[2], entry[3], item['content']
+
+def generate_xlsx(original_content, modified_content, position_index=None):
+    """生成修改后的Excel文档"""
+    wb = Workbook()
+    modified_data = _load_json(modified_content)
+    
+    # 按工作表名称创建工作表并填充数据（Excel行号、列号从1开始）
+    sheets = {}
+    for sheet_name, row, col, content in iter_modified_cells(modified_data, position_index):
+        ws = sheets.get(sheet_name)
+        if ws is None:
+            ws = wb.active if not sheets else wb.create_sheet()
+            ws.title = sheet_name
+            sheets[sheet_name] = ws
+        ws.cell(row=row + 1, column=col + 1, value=content)
     
     # 保存到临时文件
     with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_file:
@@ -67,18 +137,20 @@ def generate_xlsx(original_content, modified_content):
     os.unlink(temp_file_path)
     return file_content
 
-def generate_pptx(original_content, modified_content):
+def generate_pptx(original_content, modified_content, position_index=None):
     """生成修改后的PowerPoint文档"""
     prs = Presentation()
-    modified_data = json.loads(modified_content)
+    modified_data = _load_json(modified_content)
+    position_index = position_index or PositionIndex()
     
     # 简单重建文档
     slide_content_map = {}
     for item in modified_data:
         if item['type'] == 'slide_shape':
-            parts = item['position'].split('_')
-            slide_idx = int(parts[1])
-            shape_idx = int(parts[3])
+            entry = position_index.lookup(item['position'])
+            if entry is None or entry[0] != 'shape':
+                continue
+            _, slide_idx, shape_idx = entry
             
             if slide_idx not in slide_content_map:
                 slide_content_map[slide_idx] = []
@@ -110,16 +182,457 @@ def generate_pptx(original_content, modified_content):
     os.unlink(temp_file_path)
     return file_content
 
+# ---------- 在原文档上就地修改 ----------
+
+_NS = {
+    'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
+    's': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships'
+}
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+# python-pptx 中 slide.shapes 包含的元素，形状下标按这些元素计数
+_SHAPE_TAGS = {f"{{{_NS['p']}}}{tag}" for tag in ('sp', 'grpSp', 'graphicFrame', 'cxnSp', 'pic', 'contentPart')}
+
+# 原样拷贝未修改成员。Dify 代码节点只能是单个自包含文件，下面的 ZIP 辅助函数与
+# excelDate/dify_date_parser.py 中的同名函数相同，修改时需同步修改那一份。
+_LOCAL_HEADER_STRUCT = struct.Struct('<4s2B4HL2L2H')
+_DATA_DESCRIPTOR_FLAG = 0x08
+_ZIP64_EXTRA_ID = 0x0001
+# 原样拷贝压缩数据时的块大小
+RAW_COPY_CHUNK_SIZE = 1024 * 1024
+# 原样读写压缩数据依赖的 ZipFile 内部属性（zipfile 没有公开的原样拷贝接口）
+_RAW_READ_ATTRS = ('_lock', 'fp')
+_RAW_WRITE_ATTRS = ('_lock', 'fp', 'start_dir', '_seekable', '_writecheck', '_didModify', 'filelist', 'NameToInfo')
+
+def _tag(prefix, name):
+    return f"{{{_NS[prefix]}}}{name}"
+
+# run 中除 w:t 和 w:br 以外有文本的元素，与 python-docx 的 run.text 一致
+_DOCX_RUN_TEXT = {
+    _tag('w', 'tab'): '\t',
+    _tag('w', 'ptab'): '\t',
+    _tag('w', 'cr'): '\n',
+    _tag('w', 'noBreakHyphen'): '-'
+}
+
+def _supports_raw_io(zip_file, attrs):
+    """检查 zipfile 的内部实现是否仍提供原样读写需要的属性，缺失时改用公开接口"""
+    return hasattr(zipfile.ZipInfo, 'FileHeader') and all(hasattr(zip_file, name) for name in attrs)
+
+def _strip_zip64_extra(extra):
+    """去掉extra字段中的ZIP64记录，写入时由ZipInfo按需重新生成"""
+    fields = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        field_id, field_size = struct.unpack('<HH', extra[pos:pos + 4])
+        end = pos + 4 + field_size
+        if field_id != _ZIP64_EXTRA_ID:
+            fields.append(extra[pos:end])
+        pos = end
+    return b''.join(fields)
+
+def _copy_member_decompressed(zip_ref, new_zip, info):
+    """通过 zipfile 的公开接口解压后按原压缩方式重新写入，内部属性不可用时使用"""
+    new_info = copy.copy(info)
+    new_info.extra = _strip_zip64_extra(info.extra)
+    force_zip64 = info.file_size >= zipfile.ZIP64_LIMIT
+    with zip_ref.open(info) as source, new_zip.open(new_info, 'w', force_zip64=force_zip64) as target:
+        shutil.copyfileobj(source, target, RAW_COPY_CHUNK_SIZE)
+
+def _copy_member_raw(zip_ref, new_zip, info):
+    """
+    将未修改的ZIP成员按原始压缩数据写入目标ZIP，不解压也不重新压缩
+
+    保留原有的压缩方式、CRC和大小；zipfile没有公开的原样拷贝接口，
+    这里按 ZipFile.mkdir 的写法直接写入本地文件头和数据。
+    当前Python版本缺少所需的内部属性时，退回到解压后重新压缩的拷贝。
+    """
+    if not (_supports_raw_io(zip_ref, _RAW_READ_ATTRS) and _supports_raw_io(new_zip, _RAW_WRITE_ATTRS)):
+        _copy_member_decompressed(zip_ref, new_zip, info)
+        return
+
+    new_info = copy.copy(info)
+    # 大小和CRC已知，直接写在本地文件头中，不需要数据描述符
+    new_info.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    new_info.extra = _strip_zip64_extra(info.extra)
+
+    with zip_ref._lock:
+        _write_member_raw(new_zip, new_info, _iter_member_raw(zip_ref, info))
+
+def _iter_member_raw(zip_ref, info):
+    """逐块读取ZIP成员的原始压缩数据，不解压；调用方需持有 zip_ref._lock"""
+    zip_ref.fp.seek(info.header_offset)
+    header = _LOCAL_HEADER_STRUCT.unpack(zip_ref.fp.read(_LOCAL_HEADER_STRUCT.size))
+    zip_ref.fp.seek(header[-2] + header[-1], io.SEEK_CUR)  # 跳过文件名和extra字段
+
+    remaining = info.compress_size
+    while remaining > 0:
+        block = zip_ref.fp.read(min(remaining, RAW_COPY_CHUNK_SIZE))
+        if not block:
+            raise zipfile.BadZipFile(f"压缩数据不完整: {info.filename}")
+        yield block
+        remaining -= len(block)
+
+def _write_member_raw(new_zip, new_info, blocks):
+    """按 ZipFile.mkdir 的写法写入本地文件头，再依次写入已压缩好的数据块"""
+    with new_zip._lock:
+        if new_zip._seekable:
+            new_zip.fp.seek(new_zip.start_dir)
+        new_info.header_offset = new_zip.fp.tell()
+        new_zip._writecheck(new_info)
+        new_zip._didModify = True
+        new_zip.filelist.append(new_info)
+        new_zip.NameToInfo[new_info.filename] = new_info
+        new_zip.fp.write(new_info.FileHeader())
+        for block in blocks:
+            new_zip.fp.write(block)
+        new_zip.start_dir = new_zip.fp.tell()
+
+def _rewritten_info(info):
+    """改写后成员的 ZipInfo：沿用源成员的名称、修改时间和文件属性，按 DEFLATED 压缩"""
+    new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    new_info.compress_type = zipfile.ZIP_DEFLATED
+    new_info.external_attr = info.external_attr
+    return new_info
+
+def collect_edits(modified_data=None, parsed_content=None, formatted_dates=None):
+    """
+    汇总需要修改的位置
+
+    :param modified_data: 修改后的内容项列表或列式结构，每项给出该位置的完整新文本
+    :param parsed_content: 文档解析节点输出的原始 content；提供时只保留内容有变化的项
+    :param formatted_dates: 日期格式化节点的输出，按位置把 original_text 替换为 formatted_text
+    :return: {position: 新的完整文本，或 [(原文, 新文本), ...]}
+    """
+    edits = {}
+    if modified_data:
+        if isinstance(modified_data, dict) and modified_data.get('format') == 'columnar':
+            values = modified_data['values']
+            items = (
+                {'position': f"sheet_{sheet['name']}_row_{row}_col_{col}", 'content': values[value_id]}
+                for sheet in modified_data['sheets']
+                for row, col, value_id in zip(sheet['rows'], sheet['cols'], sheet['value_ids'])
+            )
+        else:
+            items = modified_data
+        original = {item['position']: item['content'] for item in parsed_content or []}
+        for item in items:
+            position = item.get('position')
+            if position is None or (original and original.get(position) == item.get('content')):
+                continue
+            edits[position] = item.get('content') or ''
+
+    for date_info in formatted_dates or []:
+        position = date_info.get('position')
+        original_text = date_info.get('original_text')
+        formatted_text = date_info.get('formatted_text')
+        if date_info.get('status') != 'success' or not original_text or formatted_text in (None, original_text):
+            continue
+        replacements = edits.setdefault(position, [])
+        if isinstance(replacements, list) and (original_text, formatted_text) not in replacements:
+            replacements.append((original_text, formatted_text))
+    return edits
+
+def _apply_edit(old_text, edit):
+    if isinstance(edit, str):
+        return edit
+    new_text = old_text
+    for original_text, formatted_text in edit:
+        new_text = new_text.replace(original_text, formatted_text)
+    return new_text
+
+def _rewrite_segments(segments, new_text):
+    """
+    把一组文本片段的内容改为 new_text，只改动新旧文本不同的区间
+
+    :param segments: [(文本元素或None, 文本)]，None 表示制表符、换行等不可编辑的片段
+    区间前后的文本和所在的 run 保持不变，改动的文字放入区间起点所在的文本元素，
+    因此只改日期时原有格式都会保留。
+    """
+    old_text = ''.join(text for _, text in segments)
+    editable = [i for i, (element, _) in enumerate(segments) if element is not None]
+    if old_text == new_text or not editable:
+        return False
+    prefix = 0
+    limit = min(len(old_text), len(new_text))
+    while prefix < limit and old_text[prefix] == new_text[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_text[-1 - suffix] == new_text[-1 - suffix]:
+        suffix += 1
+    start, end = prefix, len(old_text) - suffix
+    insert = new_text[prefix:len(new_text) - suffix]
+
+    bounds = []
+    offset = 0
+    for _, text in segments:
+        bounds.append((offset, offset + len(text)))
+        offset += len(text)
+    # 插入点：包含区间起点的文本元素，没有时取起点之前最近的一个
+    target = next((i for i in editable if bounds[i][0] <= start < bounds[i][1]), None)
+    if target is None:
+        target = next((i for i in reversed(editable) if bounds[i][1] <= start), editable[0])
+
+    for i in editable:
+        element, text = segments[i]
+        seg_start, seg_end = bounds[i]
+        cut_start = min(max(start, seg_start), seg_end) - seg_start
+        cut_end = max(min(end, seg_end), seg_start) - seg_start
+        new_segment = text[:cut_start] + (insert if i == target else '') + text[cut_end:]
+        if new_segment == text:
+            continue
+        element.text = new_segment
+        if new_segment != new_segment.strip() and element.tag == _tag('w', 't'):
+            element.set(_XML_SPACE, 'preserve')
+    return True
+
+def _edit_segments(read_segments, edit):
+    """
+    按修改内容改写文本片段
+
+    替换列表中的每一处替换分别调用 _rewrite_segments，同一段落里的多个日期
+    各自只改动所在的区间，中间的制表符和其他 run 不受影响。
+    """
+    if isinstance(edit, str):
+        return _rewrite_segments(read_segments(), edit)
+    changed = False
+    for original_text, formatted_text in edit:
+        searched = 0
+        while True:
+            segments = read_segments()
+            old_text = ''.join(text for _, text in segments)
+            found = old_text.find(original_text, searched)
+            if found < 0:
+                break
+            new_text = old_text[:found] + formatted_text + old_text[found + len(original_text):]
+            changed = _rewrite_segments(segments, new_text) or changed
+            searched = found + len(formatted_text)
+    return changed
+
+def _docx_runs(paragraph):
+    """段落自身的 run：直接子元素和超链接中的 run，不进入文本框等嵌套内容"""
+    for child in paragraph:
+        if child.tag == _tag('w', 'r'):
+            yield child
+        elif child.tag == _tag('w', 'hyperlink'):
+            yield from child.iterchildren(_tag('w', 'r'))
+
+def _docx_segments(paragraph):
+    """Word 段落的文本片段，与 python-docx 的 paragraph.text 对应"""
+    segments = []
+    for run in _docx_runs(paragraph):
+        for element in run:
+            if element.tag == _tag('w', 't'):
+                segments.append((element, element.text or ''))
+            elif element.tag == _tag('w', 'br'):
+                # 分页符和分栏符在 paragraph.text 中没有对应文本
+                if element.get(_tag('w', 'type'), 'textWrapping') == 'textWrapping':
+                    segments.append((None, '\n'))
+            elif element.tag in _DOCX_RUN_TEXT:
+                segments.append((None, _DOCX_RUN_TEXT[element.tag]))
+    return segments
+
+def _pptx_segments(shape):
+    """PowerPoint 形状的文本片段，与 python-pptx 的 shape.text 对应"""
+    segments = []
+    for paragraph_idx, paragraph in enumerate(shape.iter(_tag('a', 'p'))):
+        if paragraph_idx:
+            segments.append((None, '\n'))
+        for child in paragraph:
+            if child.tag in (_tag('a', 'r'), _tag('a', 'fld')):
+                text_element = child.find(_tag('a', 't'))
+                if text_element is not None:
+                    segments.append((text_element, text_element.text or ''))
+            elif child.tag == _tag('a', 'br'):
+                segments.append((None, '\v'))
+    return segments
+
+def _read_rels(zip_ref, rels_name, base_dir):
+    """读取关系文件，返回 {关系ID: 成员路径}"""
+    rels = {}
+    root = etree.fromstring(zip_ref.read(rels_name))
+    for rel in root.iter(_tag('rel', 'Relationship')):
+        target = rel.get('Target')
+        rels[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(base_dir, target))
+    return rels
+
+def _column_letter(col_idx):
+    letters = ''
+    col_idx += 1
+    while col_idx:
+        col_idx, remainder = divmod(col_idx - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _plan_docx(zip_ref, located):
+    """Word：所有段落都在 word/document.xml 中，段落下标对应 body 的直接子段落"""
+    return {'word/document.xml': located}
+
+def _patch_docx_part(root, edits, shared_strings):
+    paragraphs = root.find(_tag('w', 'body')).findall(_tag('w', 'p'))
+    changed = 0
+    for entry, edit in edits:
+        _, index, paragraph_idx = entry
+        # 没有位置索引时只知道非空段落的序号，按非空段落重新计数
+        if paragraph_idx is None:
+            non_empty = [p for p in paragraphs if ''.join(t for _, t in _docx_segments(p)).strip()]
+            paragraph = non_empty[index] if index < len(non_empty) else None
+        else:
+            paragraph = paragraphs[paragraph_idx] if paragraph_idx < len(paragraphs) else None
+        if paragraph is None:
+            continue
+        if _edit_segments(lambda: _docx_segments(paragraph), edit):
+            changed += 1
+    return changed
+
+def _plan_pptx(zip_ref, located):
+    """PowerPoint：按 presentation.xml 中的幻灯片顺序找到每张幻灯片的成员路径"""
+    presentation = etree.fromstring(zip_ref.read('ppt/presentation.xml'))
+    rels = _read_rels(zip_ref, 'ppt/_rels/presentation.xml.rels', 'ppt')
+    slide_parts = [rels[slide.get(_tag('r', 'id'))] for slide in presentation.iter(_tag('p', 'sldId'))]
+    plan = {}
+    for entry, edit in located:
+        if entry[1] < len(slide_parts):
+            plan.setdefault(slide_parts[entry[1]], []).append((entry, edit))
+    return plan
+
+def _patch_pptx_part(root, edits, shared_strings):
+    shape_tree = root.find(f"{_tag('p', 'cSld')}/{_tag('p', 'spTree')}")
+    shapes = [child for child in shape_tree if child.tag in _SHAPE_TAGS]
+    changed = 0
+    for (_, _, shape_idx), edit in edits:
+        if shape_idx >= len(shapes):
+            continue
+        shape = shapes[shape_idx]
+        if _edit_segments(lambda: _pptx_segments(shape), edit):
+            changed += 1
+    return changed
+
+def _plan_xlsx(zip_ref, located):
+    """Excel：按 workbook.xml 中的工作表名称找到工作表的成员路径"""
+    workbook = etree.fromstring(zip_ref.read('xl/workbook.xml'))
+    rels = _read_rels(zip_ref, 'xl/_rels/workbook.xml.rels', 'xl')
+    sheet_parts = {sheet.get('name'): rels[sheet.get(_tag('r', 'id'))] for sheet in workbook.iter(_tag('s', 'sheet'))}
+    plan = {}
+    for entry, edit in located:
+        if entry[1] in sheet_parts:
+            plan.setdefault(sheet_parts[entry[1]], []).append((entry, edit))
+    return plan
+
+def _load_shared_strings(zip_ref):
+    """共享字符串表，只在需要读取原单元格文本时加载"""
+    if 'xl/sharedStrings.xml' not in zip_ref.namelist():
+        return []
+    root = etree.fromstring(zip_ref.read('xl/sharedStrings.xml'))
+    return [''.join(t.text or '' for t in si.iter(_tag('s', 't'))) for si in root.iter(_tag('s', 'si'))]
+
+def _patch_xlsx_part(root, edits, shared_strings):
+    """修改后的单元格改为内联字符串，保留样式；共享字符串表不修改，避免影响其他单元格"""
+    cells = {cell.get('r'): cell for cell in root.iter(_tag('s', 'c'))}
+    changed = 0
+    for (_, _, row, col), edit in edits:
+        cell = cells.get(f'{_column_letter(col)}{row + 1}')
+        # 公式单元格不修改，否则计算链会失效
+        if cell is None or cell.find(_tag('s', 'f')) is not None:
+            continue
+        if cell.get('t') == 's':
+            old_text = shared_strings()[int(cell.findtext(_tag('s', 'v')))]
+        elif cell.get('t') == 'inlineStr':
+            old_text = ''.join(t.text or '' for t in cell.iter(_tag('s', 't')))
+        else:
+            old_text = cell.findtext(_tag('s', 'v')) or ''
+        new_text = _apply_edit(old_text, edit)
+        if new_text == old_text:
+            continue
+        for child in list(cell):
+            cell.remove(child)
+        cell.set('t', 'inlineStr')
+        inline = etree.SubElement(cell, _tag('s', 'is'))
+        text_element = etree.SubElement(inline, _tag('s', 't'))
+        text_element.text = new_text
+        if new_text != new_text.strip():
+            text_element.set(_XML_SPACE, 'preserve')
+        changed += 1
+    return changed
+
+# 文档类型 -> (位置类型, 确定成员路径的函数, 修改成员的函数)
+PATCHERS = {
+    'docx': ('paragraph', _plan_docx, _patch_docx_part),
+    'xlsx': ('cell', _plan_xlsx, _patch_xlsx_part),
+    'pptx': ('shape', _plan_pptx, _patch_pptx_part)
+}
+
+def patch_document(original_content, document_type, edits, position_index=None):
+    """
+    在原文档上就地修改
+
+    只解析并重写包含修改位置的 XML 成员，其余成员（样式、图片、其他工作表等）
+    按原始压缩数据拷贝，耗时与修改数量相关，而与文档大小基本无关。
+
+    :param original_content: 原文档的二进制内容
+    :param edits: collect_edits 的返回值
+    :return: (新文档的二进制内容, 实际修改的位置数量)
+    """
+    kind, plan_parts, patch_part = PATCHERS[document_type]
+    position_index = position_index or PositionIndex()
+    located = []
+    for position, edit in edits.items():
+        entry = position_index.lookup(position)
+        if entry is not None and entry[0] == kind:
+            located.append((entry, edit))
+
+    changed = 0
+    output_buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(original_content)) as zip_ref:
+        plan = plan_parts(zip_ref, located) if located else {}
+        shared_cache = []
+
+        def shared_strings():
+            if not shared_cache:
+                shared_cache.append(_load_shared_strings(zip_ref))
+            return shared_cache[0]
+
+        with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as new_zip:
+            for info in zip_ref.infolist():
+                part_edits = plan.get(info.filename)
+                if part_edits:
+                    root = etree.fromstring(zip_ref.read(info))
+                    part_changed = patch_part(root, part_edits, shared_strings)
+                    if part_changed:
+                        changed += part_changed
+                        new_zip.writestr(_rewritten_info(info), etree.tostring(root, xml_declaration=True,
+                                                                              encoding='UTF-8', standalone=True))
+                        continue
+                _copy_member_raw(zip_ref, new_zip, info)
+    return output_buffer.getvalue(), changed
+
 def main(inputs):
     original_content = inputs.get('original_content')
     modified_content = inputs.get('modified_content')
     document_type = inputs.get('document_type')
+    # 文档解析节点输出的位置索引（可选），只构建一次，所有修改共用
+    position_index = PositionIndex(_load_json(inputs.get('position_index')))
+    
+    # 有原文档时在原文档上就地修改，保留全部格式；否则按内容重建
+    if original_content and document_type in PATCHERS:
+        if isinstance(original_content, str):
+            original_content = base64.b64decode(original_content)
+        edits = collect_edits(
+            _load_json(modified_content),
+            _load_json(inputs.get('parsed_content')),
+            _load_json(inputs.get('formatted_dates'))
+        )
+        file_content, _ = patch_document(original_content, document_type, edits, position_index)
+        return file_content
     
     if document_type == 'docx':
         return generate_docx(original_content, modified_content)
     elif document_type == 'xlsx':
-        return generate_xlsx(original_content, modified_content)
+        return generate_xlsx(original_content, modified_content, position_index)
     elif document_type == 'pptx':
-        return generate_pptx(original_content, modified_content)
+        return generate_pptx(original_content, modified_content, position_index)
     else:
         raise ValueError(f"不支持的文档类型: {document_type}")
@@ -1,94 +1,215 @@
-import os
-import tempfile
+import io
+from collections import namedtuple
 from docx import Document
 from openpyxl import load_workbook
 from pptx import Presentation
 
+def _open_buffer(file_content):
+    """把上传的文件内容包装为内存中的文件对象，不落盘"""
+    if isinstance(file_content, memoryview):
+        file_content = file_content.tobytes()
+    return io.BytesIO(file_content)
+
+class ParagraphPosition(namedtuple('ParagraphPosition', ['index', 'paragraph'])):
+    """Word 段落位置：index 为非空段落的序号（position 字符串中的编号），paragraph 为在文档所有段落中的下标"""
+    kind = 'paragraph'
+    item_type = 'paragraph'
+
+    def key(self):
+        return f'paragraph_{self.index}'
+
+class CellPosition(namedtuple('CellPosition', ['sheet', 'row', 'col'])):
+    """Excel 单元格位置，行列号从0开始"""
+    kind = 'cell'
+    item_type = 'cell'
+
+    def key(self):
+        return f'sheet_{self.sheet}_row_{self.row}_col_{self.col}'
+
+class ShapePosition(namedtuple('ShapePosition', ['slide', 'shape'])):
+    """PowerPoint 形状位置：幻灯片下标和形状在幻灯片中的下标"""
+    kind = 'shape'
+    item_type = 'slide_shape'
+
+    def key(self):
+        return f'slide_{self.slide}_shape_{self.shape}'
+
+def position_entry(position):
+    """位置索引中的一项：[类型, 各字段...]，可直接 JSON 序列化"""
+    return [position.kind] + list(position)
+
+def _make_item(position, text):
+    return {
+        'type': position.item_type,
+        'content': text,
+        'position': position.key()
+    }
+
+def iter_docx_entries(file_content):
+    """逐段产出Word文档的 (ParagraphPosition, 文本)"""
+    doc = Document(_open_buffer(file_content))
+    index = 0
+    for paragraph_idx, para in enumerate(doc.paragraphs):
+        if para.text.strip():
+            yield ParagraphPosition(index, paragraph_idx), para.text
+            index += 1
+
+def iter_docx(file_content):
+    """逐段解析Word文档，边解析边产出内容项"""
+    for position, text in iter_docx_entries(file_content):
+        yield _make_item(position, text)
+
+def iter_xlsx_cells(file_content):
+    """逐个产出非空单元格的 (工作表名, 行号, 列号, 文本)，行列号从0开始"""
+    workbook = load_workbook(_open_buffer(file_content), read_only=True)
+    try:
+        for sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+            for row_idx, row in enumerate(sheet.iter_rows(values_only=True)):
+                for col_idx, cell_value in enumerate(row):
+                    if cell_value is not None:
+                        text = str(cell_value)
+                        if text.strip():
+                            yield sheet_name, row_idx, col_idx, text
+    finally:
+        # 只读模式会保持文件句柄打开，提前停止迭代时也要关闭
+        workbook.close()
+
+def iter_xlsx_entries(file_content):
+    """逐个产出Excel文档的 (CellPosition, 文本)"""
+    for sheet_name, row_idx, col_idx, text in iter_xlsx_cells(file_content):
+        yield CellPosition(sheet_name, row_idx, col_idx), text
+
+def iter_xlsx(file_content):
+    """逐个单元格解析Excel文档，边解析边产出内容项"""
+    for position, text in iter_xlsx_entries(file_content):
+        yield _make_item(position, text)
+
+def build_columnar_xlsx(items):
+    """
+    把单元格内容项转换为紧凑的列式结构
+
+    每个工作表只保存三个等长数组：行号、列号、值编号；所有单元格的文本去重后
+    存放在共享的 values 表中。重复值多的表格序列化后通常只有逐项格式的几分之一。
+    """
+    values = []
+    value_ids = {}
+    sheets = []
+    sheet = None
+    for sheet_name, row_idx, col_idx, text in items:
+        if sheet is None or sheet['name'] != sheet_name:
+            sheet = {'name': sheet_name, 'rows': [], 'cols': [], 'value_ids': []}
+            sheets.append(sheet)
+        value_id = value_ids.get(text)
+        if value_id is None:
+            value_id = value_ids[text] = len(values)
+            values.append(text)
+        sheet['rows'].append(row_idx)
+        sheet['cols'].append(col_idx)
+        sheet['value_ids'].append(value_id)
+    return {
+        'format': 'columnar',
+        'values': values,
+        'sheets': sheets
+    }
+
+def iter_columnar_items(columnar):
+    """把列式结构还原为逐项的单元格内容项"""
+    values = columnar['values']
+    for sheet in columnar['sheets']:
+        sheet_name = sheet['name']
+        for row_idx, col_idx, value_id in zip(sheet['rows'], sheet['cols'], sheet['value_ids']):
+            yield _make_item(CellPosition(sheet_name, row_idx, col_idx), values[value_id])
+
+def iter_pptx_entries(file_content):
+    """逐个形状产出PowerPoint文档的 (ShapePosition, 文本)"""
+    prs = Presentation(_open_buffer(file_content))
+    for slide_idx, slide in enumerate(prs.slides):
+        for shape_idx, shape in enumerate(slide.shapes):
+            if hasattr(shape, "text") and shape.text.strip():
+                yield ShapePosition(slide_idx, shape_idx), shape.text
+
+def iter_pptx(file_content):
+    """逐个形状解析PowerPoint文档，边解析边产出内容项"""
+    for position, text in iter_pptx_entries(file_content):
+        yield _make_item(position, text)
+
+# 文件扩展名到 (文档类型, 产出 (位置, 文本) 的解析生成器)
+PARSERS = {
+    '.docx': ('docx', iter_docx_entries),
+    '.xlsx': ('xlsx', iter_xlsx_entries),
+    '.pptx': ('pptx', iter_pptx_entries)
+}
+
+def _find_parser(file_name):
+    for extension, (document_type, parser) in PARSERS.items():
+        if file_name.endswith(extension):
+            return document_type, parser
+    raise ValueError(f"不支持的文件格式: {file_name}")
+
+def iter_document(file_content, file_name):
+    """
+    按文件扩展名选择解析器，返回 (文档类型, 内容项生成器)
+
+    生成器在找到每个内容项时立即产出，下游可以在整个文档遍历完成之前开始处理。
+    """
+    document_type, parser = _find_parser(file_name)
+    return document_type, (_make_item(position, text) for position, text in parser(file_content))
+
+def parse_document(file_content, file_name):
+    """
+    解析文档，同时建立位置索引
+
+    position_index 把每个 position 字符串映射到源文档中的位置（见 position_entry），
+    文档生成节点据此直接定位，不必再拆分 position 字符串。
+    """
+    document_type, parser = _find_parser(file_name)
+    content = []
+    position_index = {}
+    for position, text in parser(file_content):
+        item = _make_item(position, text)
+        content.append(item)
+        position_index[item['position']] = position_entry(position)
+    return {
+        'document_type': document_type,
+        'content': content,
+        'position_index': position_index
+    }
+
 def parse_docx(file_content):
     """解析Word文档"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-        temp_file.write(file_content)
-        temp_file_path = temp_file.name
-        
-    doc = Document(temp_file_path)
-    content = []
-    for para in doc.paragraphs:
-        if para.text.strip():
-            content.append({
-                'type': 'paragraph',
-                'content': para.text,
-                'position': f'paragraph_{len(content)}'
-            })
-    
-    # 清理临时文件
-    os.unlink(temp_file_path)
     return {
         'document_type': 'docx',
-        'content': content
+        'content': list(iter_docx(file_content))
     }
 
-def parse_xlsx(file_content):
-    """解析Excel文档"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_file:
-        temp_file.write(file_content)
-        temp_file_path = temp_file.name
-        
-    workbook = load_workbook(temp_file_path, read_only=True)
-    content = []
-    
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-        for row_idx, row in enumerate(sheet.iter_rows(values_only=True)):
-            for col_idx, cell_value in enumerate(row):
-                if cell_value is not None and str(cell_value).strip():
-                    content.append({
-                        'type': 'cell',
-                        'content': str(cell_value),
-                        'position': f'sheet_{sheet_name}_row_{row_idx}_col_{col_idx}'
-                    })
-    
-    workbook.close()
-    os.unlink(temp_file_path)
+def parse_xlsx(file_content, compact=False):
+    """解析Excel文档；compact=True 时 content 为列式结构（见 build_columnar_xlsx）"""
+    if compact:
+        return {
+            'document_type': 'xlsx',
+            'content': build_columnar_xlsx(iter_xlsx_cells(file_content))
+        }
     return {
         'document_type': 'xlsx',
-        'content': content
+        'content': list(iter_xlsx(file_content))
     }
 
 def parse_pptx(file_content):
     """解析PowerPoint文档"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as temp_file:
-        temp_file.write(file_content)
-        temp_file_path = temp_file.name
-        
-    prs = Presentation(temp_file_path)
-    content = []
-    
-    for slide_idx, slide in enumerate(prs.slides):
-        for shape_idx, shape in enumerate(slide.shapes):
-            if hasattr(shape, "text") and shape.text.strip():
-                content.append({
-                    'type': 'slide_shape',
-                    'content': shape.text,
-                    'position': f'slide_{slide_idx}_shape_{shape_idx}'
-                })
-    
-    os.unlink(temp_file_path)
     return {
         'document_type': 'pptx',
-        'content': content
+        'content': list(iter_pptx(file_content))
     }
 
 def main(inputs):
     # 获取上传的文件内容和文件名
     file_content = inputs.get('file_content')
     file_name = inputs.get('file_name', '')
-    
-    # 根据文件扩展名选择相应的解析方法
-    if file_name.endswith('.docx'):
-        return parse_docx(file_content)
-    elif file_name.endswith('.xlsx'):
-        return parse_xlsx(file_content)
-    elif file_name.endswith('.pptx'):
-        return parse_pptx(file_content)
-    else:
-        raise ValueError(f"不支持的文件格式: {file_name}")
+
+    # Excel 可选输出紧凑的列式结构，大表格的输出体积小得多
+    if inputs.get('compact') and file_name.endswith('.xlsx'):
+        return parse_xlsx(file_content, compact=True)
+
+    # 根据文件扩展名选择相应的解析方法，同时输出位置索引
+    return parse_document(file_content, file_name)
@@ -0,0 +1,18 @@
+import json
+
+from content_batcher import merge_results
+
+
+def test_merge_skips_unparseable_batches():
+    content = [{'position': 'p1'}, {'position': 'p2'}]
+    batch_results = [
+        '```json\n[{"position": "p2", "text": "b"}]\n```',
+        '```json\n[{"position": "p1", "text": \n```',
+        '["not an object"]',
+        json.dumps([{'position': 'p1', 'text': 'a'}]),
+    ]
+
+    merged, failed = merge_results(batch_results, content)
+
+    assert [entry['position'] for entry in merged] == ['p1', 'p2']
+    assert failed == [1, 2]
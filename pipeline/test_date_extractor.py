@@ -0,0 +1,45 @@
+import datetime
+
+import pytest
+
+from date_extractor import extract_dates, extract_text_dates
+
+REFERENCE = datetime.date(2024, 3, 1)
+
+
+@pytest.mark.parametrize('text, original_text, resolved', [
+    ('3天前', '3天前', datetime.date(2024, 2, 27)),
+    ('两个月后复查', '两个月后', datetime.date(2024, 5, 1)),
+    ('十二个月后 复查', '十二个月后', datetime.date(2025, 3, 1)),
+    ('十五天前', '十五天前', datetime.date(2024, 2, 15)),
+    ('二十天后', '二十天后', datetime.date(2024, 3, 21)),
+    ('三十五天后', '三十五天后', datetime.date(2024, 4, 5)),
+    ('十天后', '十天后', datetime.date(2024, 3, 11)),
+])
+def test_relative_counts(text, original_text, resolved):
+    assert extract_text_dates(text, REFERENCE) == [(original_text, ['relative'], resolved)]
+
+
+@pytest.mark.parametrize('text', ['第十二天前', '第3天后', '一百天后', '1000天后'])
+def test_no_partial_relative_counts(text):
+    assert extract_text_dates(text, REFERENCE) == []
+
+
+def test_resolved_date_covers_whole_numeral():
+    dates = extract_dates([{'content': '十二个月后 复查', 'position': 'paragraph_0'}], REFERENCE)
+    assert dates == [{
+        'original_text': '十二个月后',
+        'position': 'paragraph_0',
+        'possible_formats': ['relative'],
+        'resolved_date': '2025-03-01 00:00:00'
+    }]
+
+
+@pytest.mark.parametrize('text', ['2023-12-05-1234', '1-2023-12-05', '12-05-2023-1', '1/12/05/2023', '010-12-05-2023'])
+def test_no_dates_inside_longer_numbers(text):
+    assert extract_text_dates(text, REFERENCE) == []
+
+
+def test_date_range_with_other_separator():
+    assert [original for original, _, _ in extract_text_dates('2023.12.05-2023.12.07', REFERENCE)] == [
+        '2023.12.05', '2023.12.07']
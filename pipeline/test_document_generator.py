@@ -0,0 +1,56 @@
+import io
+import zipfile
+
+from docx import Document
+
+import document_generator
+from document_generator import collect_edits, patch_document
+
+
+def _build_docx():
+    document = Document()
+    document.add_paragraph('开始 2024/1/5')
+    document.add_paragraph('没有日期')
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _patch(data):
+    edits = collect_edits(formatted_dates=[{
+        'position': 'paragraph_0', 'original_text': '2024/1/5',
+        'formatted_text': '2024-01-05', 'status': 'success'
+    }])
+    return patch_document(data, 'docx', edits)
+
+
+def _members(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        return {info.filename: (info.compress_type, info.date_time, archive.read(info))
+                for info in archive.infolist()}
+
+
+def test_untouched_members_keep_compressed_bytes():
+    source = _build_docx()
+    output, changed = _patch(source)
+
+    assert changed == 1
+    assert Document(io.BytesIO(output)).paragraphs[0].text == '开始 2024-01-05'
+    with zipfile.ZipFile(io.BytesIO(source)) as before, zipfile.ZipFile(io.BytesIO(output)) as after:
+        for info in before.infolist():
+            copied = after.getinfo(info.filename)
+            assert copied.date_time == info.date_time
+            if info.filename != 'word/document.xml':
+                assert (copied.CRC, copied.compress_size) == (info.CRC, info.compress_size)
+
+
+def test_copy_falls_back_without_zipfile_internals(monkeypatch):
+    source = _build_docx()
+    expected, _ = _patch(source)
+
+    monkeypatch.setattr(document_generator, '_supports_raw_io', lambda zip_file, attrs: False)
+    output, changed = _patch(source)
+
+    assert changed == 1
+    assert _members(output) == _members(expected)
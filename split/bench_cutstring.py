@@ -0,0 +1,166 @@
+"""
+cutstring 文本预处理基准测试
+
+用法：
+    python bench_cutstring.py [--scale 1000]
+
+把 "3原文本【加表格-公式】.txt" 重复 scale 次，对比旧版占位符替换实现与
+当前单次切分实现 CutstringTool._preprocess_text 的耗时，并检查两者输出是否一致。
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cutstring'))
+
+from tools.cutstring import CutstringTool  # noqa: E402
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '3原文本【加表格-公式】.txt')
+
+
+def legacy_preprocess_text(tool, text):
+    """旧版实现：多次正则替换为占位符，再逐个 replace 恢复，作为对照基线"""
+    # 提取公式（$$...$$格式）
+    formula_pattern = re.compile(r'\$\$(.*?)\$\$', re.DOTALL | re.IGNORECASE)
+    formulas = formula_pattern.findall(text)
+    non_formula_text = formula_pattern.sub('{{FORMULA}}', text)
+
+    # 增强表格提取（处理 HTML 表格）
+    html_table_pattern = re.compile(r'<table\b[^>]*>(.*?)</table>', re.DOTALL | re.IGNORECASE)
+    html_tables = html_table_pattern.findall(non_formula_text)
+    non_html_table_text = html_table_pattern.sub('{{HTML_TABLE}}', non_formula_text)
+
+    # 新的表格识别方法：基于行分析
+    lines = non_html_table_text.split('\n')
+    processed_lines = []
+    table_buffer = []
+    in_table = False
+    table_index = 0
+    tables = []
+
+    for i, line in enumerate(lines):
+        # 检查是否是表格行（包含 | 且不只是单个 |）
+        if '|' in line and line.count('|') >= 2:
+            # 检查是否是分隔符行
+            is_separator = bool(re.match(r'^\s*\|\s*[-:\s]+\s*\|\s*([-:\s]*\|\s*)*$', line))
+
+            if not in_table:
+                # 开始新表格
+                in_table = True
+                table_buffer = [line]
+            else:
+                # 继续当前表格
+                table_buffer.append(line)
+
+            # 检查下一行，决定是否结束表格
+            next_line_is_table = False
+            if i + 1 < len(lines):
+                next_line = lines[i + 1]
+                if '|' in next_line and next_line.count('|') >= 2:
+                    next_line_is_table = True
+
+            if not next_line_is_table:
+                # 表格结束
+                if table_buffer:
+                    table_content = '\n'.join(table_buffer)
+                    tables.append(table_content)
+                    processed_lines.append(f'{{{{TABLE_{table_index}}}}}')
+                    table_index += 1
+                    table_buffer = []
+                in_table = False
+        else:
+            if in_table:
+                # 表格意外结束
+                if table_buffer:
+                    table_content = '\n'.join(table_buffer)
+                    tables.append(table_content)
+                    processed_lines.append(f'{{{{TABLE_{table_index}}}}}')
+                    table_index += 1
+                    table_buffer = []
+                in_table = False
+
+            processed_lines.append(line)
+
+    # 处理最后可能的表格
+    if table_buffer:
+        table_content = '\n'.join(table_buffer)
+        tables.append(table_content)
+        processed_lines.append(f'{{{{TABLE_{table_index}}}}}')
+
+    # 重新组装文本
+    text_without_tables = '\n'.join(processed_lines)
+
+    # 提取标准 MD 表格（原有功能保持不变）
+    md_table_pattern = re.compile(r'(\|.*?\|\n)+(\|\s*[-:]+\s*\|\s*(?:\|\s*[-:]+\s*\|\s*)*\n)?(\|.*?\|\n)*', re.DOTALL)
+    md_tables = md_table_pattern.findall(text_without_tables)
+    # 将匹配到的元组转换为字符串
+    md_tables = [''.join(table) for table in md_tables]
+    non_md_table_text = md_table_pattern.sub('{{MD_TABLE}}', text_without_tables)
+
+    # 分步处理标签与非标签内容
+    def process_non_table(text: str) -> str:
+        # 处理标签外内容
+        parts = re.split(r'(<[^>]+>)', text)
+        processed = []
+        for i, part in enumerate(parts):
+            if i % 2 == 0:  # 非标签部分
+                # 删除所有空格（保留换行符）
+                part = re.sub(r'[^\S\n]', '', part)
+                # 合并连续换行符
+                part = re.sub(r'\n{2,}', '\n', part)
+                # 处理不闭合符号
+                part = tool._remove_unpaired_symbols(part)
+            processed.append(part)
+        return ''.join(processed)
+
+    processed = process_non_table(non_md_table_text)
+
+    # 恢复表格内容（保留原始格式）
+    for i, table in enumerate(tables):
+        processed = processed.replace(f'{{{{TABLE_{i}}}}}', table, 1)
+
+    # 恢复标准 MD 表格内容（保留原始格式）
+    for table in md_tables:
+        processed = processed.replace('{{MD_TABLE}}', table, 1)
+
+    # 恢复 HTML 表格内容（保留原始格式）
+    for table in html_tables:
+        processed = processed.replace('{{HTML_TABLE}}', f'<table>{table}</table>', 1)
+
+    # 恢复公式内容（保留原始格式）
+    for formula in formulas:
+        processed = processed.replace('{{FORMULA}}', f'$$\n{formula}\n$$', 1)
+
+    return processed.strip()
+
+
+def bench(label, func, text):
+    start = time.perf_counter()
+    output = func(text)
+    elapsed = time.perf_counter() - start
+    size_mb = len(text.encode('utf-8')) / 1024 / 1024
+    print(f"  {label}: 耗时 {elapsed:.2f}s，{size_mb / elapsed:.2f} MB/s")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='cutstring 文本预处理基准测试')
+    parser.add_argument('--scale', type=int, default=1000, help='样本文本重复次数')
+    args = parser.parse_args()
+
+    with open(SAMPLE_PATH, encoding='utf-8') as f:
+        sample = f.read()
+    text = '\n'.join([sample] * args.scale)
+    print(f"[INFO] 文本大小: {len(text.encode('utf-8')) / 1024 / 1024:.1f} MB")
+
+    # 只调用不依赖插件运行时的方法，不需要初始化 Tool
+    tool = CutstringTool.__new__(CutstringTool)
+    legacy = bench('旧版占位符替换', lambda t: legacy_preprocess_text(tool, t), text)
+    current = bench('单次切分', tool._preprocess_text, text)
+    print(f"  输出一致: {legacy == current}")
+
+
+if __name__ == "__main__":
+    main()
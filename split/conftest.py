@@ -0,0 +1,13 @@
+import os
+
+# dify_plugin 导入时用 gevent 替换 threading 等标准库模块，会影响同一次 pytest 运行中
+# 其他目录的测试（例如 excelDate 的进程池）。插件测试由 test_cutstring_isolated.py
+# 在单独的 pytest 进程中运行，该进程设置了这个环境变量；直接指定 test_cutstring.py 时照常收集。
+ISOLATED_ENV = 'CUTSTRING_TESTS_ISOLATED'
+
+
+def pytest_ignore_collect(collection_path, config):
+    if collection_path.name != 'test_cutstring.py' or os.environ.get(ISOLATED_ENV):
+        return None
+    requested = {os.path.abspath(arg.split('::')[0]) for arg in config.invocation_params.args}
+    return str(collection_path) not in requested
@@ -0,0 +1,629 @@
+#V1.1升级版cutstring，可以保留md，html表格和公式，支持智能分块，支持word，pdf
+from collections.abc import Callable, Generator, Iterator
+from functools import lru_cache
+import json
+import os
+import re
+from typing import Any
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+# 受保护内容：公式（$$...$$）、HTML 表格和标准 MD 表格，保留原始格式，不做清洗
+_FORMULA_PATTERN = re.compile(r'\$\$(.*?)\$\$', re.DOTALL | re.IGNORECASE)
+_HTML_TABLE_PATTERN = re.compile(r'(<table\b[^>]*>)(.*?)</table>', re.DOTALL | re.IGNORECASE)
+_MD_TABLE_PATTERN = re.compile(r'(\|.*?\|\n)+(\|\s*[-:]+\s*\|\s*(?:\|\s*[-:]+\s*\|\s*)*\n)?(\|.*?\|\n)*', re.DOTALL)
+_TAG_PATTERN = re.compile(r'(<[^>]+>)')
+_SPACE_PATTERN = re.compile(r'[^\S\n]')
+_BLANK_LINES_PATTERN = re.compile(r'\n{2,}')
+# 语义分割点：换行和句末标点
+_SEMANTIC_BREAK_PATTERN = re.compile(r'[\n。！？!?.；;]')
+# 中日韩文字和全角字符
+_WIDE_CHARS = '⺀-鿿가-힯豈-﫿＀-￯'
+# 近似分词：中日韩文字和标点各算一个 token，其他文字每 4 个字符一个 token，换行一个 token，空格不计
+_APPROX_TOKEN_PATTERN = re.compile(rf'[{_WIDE_CHARS}]|[^\W{_WIDE_CHARS}]{{1,4}}|\n|[^\w\s]')
+# WordPiece 预切分：中日韩文字和标点单独成词，其余按空白分词
+_BASIC_TOKEN_PATTERN = re.compile(rf'[{_WIDE_CHARS}]|[^\w\s]|_|[^\W_{_WIDE_CHARS}]+')
+# 父子分段的结构标记：## 单独一行、Markdown 标题、3.1 / 3.12 / 1、 这样的编号
+_MARKER_LINE = '##'
+_MD_HEADING_PATTERN = re.compile(r'(#{1,6})(?!#)\s*(\S.*)')
+# 编号不以0开头，后面可以跟 、 . ． 或空白，见 _numbered_level
+_NUMBERED_PATTERN = re.compile(r'([1-9]\d?(?:\.\d{1,2}){0,3})([、.．]|\s+)?')
+# 紧跟在数字后面的单位和量词，说明这是数量而不是编号：5个小时后、2.5米、3.5%
+_NUMBER_UNITS = frozenset('个只件条项次位名人岁年月日号天周时点分秒米厘毫千万亿克斤吨升元角倍度%％℃°')
+_NUMBER_OPENERS = '"\'“‘（(【['
+# data_process 插件输出的父段标题行
+_PARENT_TITLE_PREFIX = '父段：'
+# 没有标题时取第一个子段的前若干个字作为父段标题
+_MAX_TITLE_CHARS = 20
+# 父段开头不带编号的短行视为父段标题
+_MAX_TITLE_LINE_CHARS = 40
+# 与插件一同发布的词表（BERT 格式，每行一个 token），不存在时使用近似分词
+VOCAB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vocab.txt')
+
+def _pick_sentinel(text: str) -> str:
+    """选一个文本中没有出现的私有区字符，代表一段受保护内容"""
+    for code in range(0xE000, 0xF900):
+        if chr(code) not in text:
+            return chr(code)
+    raise ValueError("文本中没有可用的占位字符")
+
+def _expand(piece: str, sentinel: str, rendered: Iterator[str]) -> str:
+    """把片段中的占位字符依次换回对应的受保护内容"""
+    if sentinel not in piece:
+        return piece
+    parts = piece.split(sentinel)
+    return ''.join(part if i == 0 else next(rendered) + part for i, part in enumerate(parts))
+
+def _mask_matches(pattern: re.Pattern, masked: str, spans: list[str], sentinel: str,
+                  render: Callable[[re.Match, Callable[[str], str]], str]) -> tuple[str, list[str]]:
+    """
+    把 pattern 的每个匹配替换为一个占位字符
+
+    匹配中已有的占位字符由 render 通过 expand 换回原内容后并入新的受保护内容，
+    返回的 spans 与新文本中的占位字符一一对应。
+    """
+    rendered = iter(spans)
+    pieces = []
+    new_spans = []
+    pos = 0
+    for match in pattern.finditer(masked):
+        before = masked[pos:match.start()]
+        new_spans.extend(next(rendered) for _ in range(before.count(sentinel)))
+        pieces.append(before)
+        pieces.append(sentinel)
+        new_spans.append(render(match, lambda piece: _expand(piece, sentinel, rendered)))
+        pos = match.end()
+    pieces.append(masked[pos:])
+    new_spans.extend(rendered)
+    return ''.join(pieces), new_spans
+
+def _render_html_table(match: re.Match, expand: Callable[[str], str]) -> str:
+    # 与原实现一致，只保留 <table> 标签本身，不保留属性
+    expand(match.group(1))
+    return f'<table>{expand(match.group(2))}</table>'
+
+def _classify_line(line: str, sentinel: str) -> tuple[str, int]:
+    """
+    识别一行（已去掉首尾空白）的结构类型，返回 (类型, 层级)
+
+    类型为 marker（## 标记）、block（单独成行的表格或公式）、heading（Markdown 标题）、
+    numbered（编号条目）或 text；只有 heading 和 numbered 有层级，层级从1开始。
+    """
+    if line == _MARKER_LINE:
+        return 'marker', 0
+    if line == sentinel:
+        return 'block', 0
+    match = _MD_HEADING_PATTERN.match(line)
+    if match:
+        return 'heading', len(match.group(1))
+    level = _numbered_level(line)
+    if level:
+        return 'numbered', level
+    return 'text', 0
+
+def _numbered_level(line: str) -> int:
+    """
+    编号条目的层级，不是编号条目时返回0
+
+    一级编号后必须有分隔符（1、 1. 1．或空白），多级编号（3.3上机前）可以直接接正文；
+    编号后紧跟数字、字母或单位量词时是数量（5个小时后、0.5mm、2.5kg），不是编号。
+    """
+    # 编号前可能有引号、括号，如 "3.3上机前：...
+    text = line.lstrip(_NUMBER_OPENERS)
+    match = _NUMBERED_PATTERN.match(text)
+    if not match:
+        return 0
+    number, separator = match.groups()
+    level = number.count('.') + 1
+    rest = text[match.end():]
+    if rest[:1].isdigit() or rest[:1] in ('.', '．'):
+        return 0
+    if separator in ('、', '.', '．'):
+        return level
+    if separator is None and (level == 1 or (rest[:1].isascii() and rest[:1].isalpha())):
+        return 0
+    if rest[:1] in _NUMBER_UNITS:
+        return 0
+    return level
+
+def _parent_title(line: str) -> str:
+    """去掉 父段：[...] 标题行的前缀和方括号"""
+    title = line[len(_PARENT_TITLE_PREFIX):].strip()
+    if title[:1] in ('[', '【') and title[-1:] in (']', '】'):
+        title = title[1:-1].strip()
+    return title
+
+def render_parent(parent: dict[str, Any]) -> str:
+    """按 data_process 插件的输出格式拼出父段：##、父段标题行，子段之间用换行分隔"""
+    return '\n'.join([_MARKER_LINE, _PARENT_TITLE_PREFIX + parent['parent']] + parent['children'])
+
+def _fit_title(title: str, budget: int, counter: 'ByteCounter | ApproxTokenCounter') -> str:
+    """从末尾截短父段标题，直到父段头部（##、父段：标题）不超过 budget"""
+    while title and counter.count(render_parent({'parent': title, 'children': []})) > budget:
+        title = title[:-1]
+    return title
+
+class ByteCounter:
+    """按 UTF-8 字节数计算长度"""
+
+    def count(self, text: str) -> int:
+        return len(text.encode('utf-8'))
+
+    def measure(self, text: str) -> tuple[int, bytes]:
+        """返回 (长度, 编码后的字节)，超长时把字节交给 split，不再重复编码"""
+        text_bytes = text.encode('utf-8')
+        return len(text_bytes), text_bytes
+
+    def split(self, text: str, max_size: int, measured: bytes | None = None) -> list[str]:
+        """
+        强制分割超长段落：每块不超过 max_size 字节，切分点退到字符边界
+
+        :param measured: measure 返回的字节，提供时不再编码 text
+        """
+        text_bytes = measured if measured is not None else text.encode('utf-8')
+        chunks = []
+        start = 0
+
+        while start < len(text_bytes):
+            end = min(start + max_size, len(text_bytes))
+
+            # 防止截断中间字符
+            while start < end < len(text_bytes) and (text_bytes[end] & 0b11000000) == 0b10000000:
+                end -= 1
+            if end == start:
+                # 单个字符超过上限时也至少取一个完整字符
+                end += 1
+                while end < len(text_bytes) and (text_bytes[end] & 0b11000000) == 0b10000000:
+                    end += 1
+
+            chunks.append(text_bytes[start:end].decode('utf-8'))
+            start = end
+
+        return chunks
+
+class ApproxTokenCounter:
+    """
+    按字符类别近似计算 token 数，不需要词表
+
+    拼接文本的 token 数不超过各部分之和，分块按各段之和累加不会超出上限。
+    同一段文本的计数会被缓存，重复出现的段落（页眉、页脚等）只分词一次；
+    缓存属于计数器实例，每次调用工具新建计数器（见 get_token_counter），不会跨调用保留段落文本。
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        return len(_APPROX_TOKEN_PATTERN.findall(text))
+
+    def measure(self, text: str) -> tuple[int, None]:
+        """返回 (长度, None)，与 ByteCounter.measure 的接口一致"""
+        return self.count(text), None
+
+    def _token_ends(self, text: str) -> Iterator[int]:
+        """依次产出每个 token 在文本中的结束位置"""
+        for match in _APPROX_TOKEN_PATTERN.finditer(text):
+            yield match.end()
+
+    def split(self, text: str, max_size: int, measured: None = None) -> list[str]:
+        """强制分割超长段落：每块不超过 max_size 个 token，切分点落在 token 边界"""
+        chunks = []
+        start = 0
+        tokens = 0
+        for end in self._token_ends(text):
+            tokens += 1
+            if tokens == max_size:
+                chunks.append(text[start:end])
+                start = end
+                tokens = 0
+        if start < len(text):
+            # 末尾不含 token 的空白并入上一块
+            if tokens == 0 and chunks:
+                chunks[-1] += text[start:]
+            else:
+                chunks.append(text[start:])
+        return chunks
+
+class WordPieceTokenCounter(ApproxTokenCounter):
+    """按 BERT 格式词表做 WordPiece 最长匹配分词，与 bge 等中文向量模型的计数基本一致"""
+
+    def __init__(self, vocab: frozenset[str], lowercase: bool = True, cache_size: int = 4096,
+                 word_cache_size: int = 65536):
+        super().__init__(cache_size)
+        self.vocab = vocab
+        self.lowercase = lowercase
+        self._piece_ends = lru_cache(maxsize=word_cache_size)(self._piece_ends)
+
+    def _piece_ends(self, word: str) -> tuple[int, ...]:
+        """单词切分为词表中子词后各子词的结束位置；无法切分时整个单词算一个 [UNK]"""
+        lowered = word.lower() if self.lowercase else word
+        if len(lowered) != len(word) or len(word) > 100:
+            return (len(word),)
+        ends = []
+        start = 0
+        while start < len(lowered):
+            end = len(lowered)
+            while end > start:
+                piece = lowered[start:end] if start == 0 else '##' + lowered[start:end]
+                if piece in self.vocab:
+                    break
+                end -= 1
+            else:
+                return (len(word),)
+            ends.append(end)
+            start = end
+        return tuple(ends)
+
+    def _count(self, text: str) -> int:
+        return sum(len(self._piece_ends(word)) for word in _BASIC_TOKEN_PATTERN.findall(text))
+
+    def _token_ends(self, text: str) -> Iterator[int]:
+        for match in _BASIC_TOKEN_PATTERN.finditer(text):
+            for end in self._piece_ends(match.group()):
+                yield match.start() + end
+
+_BYTE_COUNTER = ByteCounter()
+
+@lru_cache(maxsize=1)
+def _load_vocab() -> frozenset[str] | None:
+    """读取插件目录中的 vocab.txt，进程内只读取一次；不存在时返回 None"""
+    if not os.path.exists(VOCAB_PATH):
+        return None
+    with open(VOCAB_PATH, encoding='utf-8') as f:
+        return frozenset(line.rstrip('\n') for line in f if line.strip())
+
+def get_token_counter() -> ApproxTokenCounter:
+    """
+    插件目录中有 vocab.txt 时按词表分词，否则按字符类别近似
+
+    词表全进程共享；计数缓存随计数器新建，调用结束后与计数器一起释放。
+    """
+    vocab = _load_vocab()
+    return WordPieceTokenCounter(vocab) if vocab is not None else ApproxTokenCounter()
+
+class CutstringTool(Tool):
+    def _tokenize(self, text: str, sentinel: str) -> tuple[str, list[str]]:
+        """
+        切分出受保护内容和普通文本
+
+        受保护内容在返回的文本中各替换为一个占位字符，并按出现顺序返回它们的输出形式。
+        每种内容各扫描一遍，依次为公式、HTML 表格、逐行识别的表格和标准 MD 表格；
+        原文中已有的 {{FORMULA}} 等文字按普通文本处理。
+        """
+        masked, spans = _mask_matches(_FORMULA_PATTERN, text, [], sentinel,
+                                      lambda match, expand: f'$$\n{match.group(1)}\n$$')
+        masked, spans = _mask_matches(_HTML_TABLE_PATTERN, masked, spans, sentinel, _render_html_table)
+
+        # 逐行识别表格：连续的包含至少两个 | 的行为一个表格
+        rendered = iter(spans)
+        lines = []
+        table_lines = []
+        spans = []
+        for line in masked.split('\n'):
+            if line.count('|') >= 2:
+                table_lines.append(_expand(line, sentinel, rendered))
+                continue
+            if table_lines:
+                lines.append(sentinel)
+                spans.append('\n'.join(table_lines))
+                table_lines = []
+            lines.append(line)
+            spans.extend(next(rendered) for _ in range(line.count(sentinel)))
+        if table_lines:
+            lines.append(sentinel)
+            spans.append('\n'.join(table_lines))
+        masked = '\n'.join(lines)
+
+        return _mask_matches(_MD_TABLE_PATTERN, masked, spans, sentinel,
+                             lambda match, expand: expand(match.group(0)))
+
+    def _clean_text(self, text: str) -> str:
+        """清洗普通文本：标签外删除空白（保留换行）、合并连续换行、去掉不闭合的符号"""
+        parts = _TAG_PATTERN.split(text)
+        for i in range(0, len(parts), 2):
+            part = _SPACE_PATTERN.sub('', parts[i])
+            part = _BLANK_LINES_PATTERN.sub('\n', part)
+            parts[i] = self._remove_unpaired_symbols(part)
+        return ''.join(parts)
+
+    def _preprocess_masked(self, text: str) -> tuple[str, list[str], str]:
+        """清洗文本，受保护内容仍为占位字符，返回 (清洗后的文本, 受保护内容, 占位字符)"""
+        sentinel = _pick_sentinel(text)
+        masked, spans = self._tokenize(text, sentinel)
+        return self._clean_text(masked), spans, sentinel
+
+    def _preprocess_text(self, text: str) -> str:
+        """
+        清洗文本，保留公式、HTML 表格和 MD 表格的原始格式
+
+        先一次切分出受保护内容，只清洗普通文本，最后一次拼接，
+        不再对整篇文本反复替换占位符。
+        """
+        cleaned, spans, sentinel = self._preprocess_masked(text)
+        parts = cleaned.split(sentinel)
+        pieces = [parts[0]]
+        for span, part in zip(spans, parts[1:]):
+            pieces.append(span)
+            pieces.append(part)
+        return ''.join(pieces).strip()
+
+    def _remove_unpaired_symbols(self, text: str) -> str:
+        """处理不闭合的括号和引号"""
+        # 处理括号
+        pairs = {'(': ')', '[': ']', '{': '}', '【': '】', '（': '）'}
+        stack = []
+        indices = set()
+        for i, c in enumerate(text):
+            if c in pairs:
+                stack.append((i, c))
+            elif c in pairs.values():
+                if stack and pairs.get(stack[-1][1]) == c:
+                    stack.pop()
+                else:
+                    indices.add(i)
+        indices.update([i for i, _ in stack])
+        
+        # 处理引号（考虑中文引号）
+        quote_stack = []
+        for i, c in enumerate(text):
+            if c in ('"', "'", '“', '”'):
+                if quote_stack and quote_stack[-1][1] == c:
+                    quote_stack.pop()
+                else:
+                    quote_stack.append((i, c))
+        indices.update([i for i, _ in quote_stack])
+
+        return ''.join([c for i, c in enumerate(text) if i not in indices])
+
+    def _chunk_text(self, text: str, max_size: int = 4000, counter: ByteCounter | ApproxTokenCounter | None = None) -> list[str]:
+        """智能分块，返回全部分块，见 _iter_chunks"""
+        return list(self._iter_chunks(text, max_size, counter))
+
+    def _iter_chunks(self, text: str, max_size: int = 4000,
+                     counter: ByteCounter | ApproxTokenCounter | None = None) -> Iterator[str]:
+        """
+        智能分块核心逻辑，每分出一块立即产出
+
+        :param max_size: 每块的长度上限，单位由 counter 决定
+        :param counter: 计算长度和强制分割的方式，默认按 UTF-8 字节数；每段文本只计数一次
+        """
+        counter = counter or _BYTE_COUNTER
+        # 段落之间用换行连接，换行本身也占长度
+        separator_size = counter.count('\n')
+        
+        # 优先处理人工标记
+        if '##\n' in text:
+            for section in text.split('##\n'):
+                section = section.strip()
+                if not section:
+                    continue
+                if counter.count(section) <= max_size:
+                    yield section
+                else:
+                    yield from self._split_by_semantic(section, max_size, counter)
+            return
+
+        # 无人工标记时智能分块
+        current_chunk = []
+        current_size = 0
+        paragraphs = text.split('\n')
+        
+        for para in paragraphs:
+            if not para.strip():
+                continue
+            
+            para_size = counter.count(para)
+            
+            # 处理超长段落
+            if para_size > max_size:
+                if current_chunk:
+                    yield '\n'.join(current_chunk)
+                    current_chunk = []
+                    current_size = 0
+                yield from self._split_by_semantic(para, max_size, counter)
+                continue
+            
+            # 合并段落
+            if current_chunk and current_size + para_size + separator_size > max_size:
+                yield '\n'.join(current_chunk)
+                current_chunk = [para]
+                current_size = para_size
+            else:
+                current_chunk.append(para)
+                current_size += para_size + separator_size
+        
+        if current_chunk:
+            yield '\n'.join(current_chunk)
+
+    def _split_by_semantic(self, text: str, max_size: int, counter: ByteCounter | ApproxTokenCounter | None = None) -> list[str]:
+        """语义感知分割"""
+        counter = counter or _BYTE_COUNTER
+        chunks = []
+        buffer = []
+        buffer_size = 0
+        split_positions = [0]
+        
+        # 预计算所有可能的分割点
+        for match in _SEMANTIC_BREAK_PATTERN.finditer(text):
+            split_positions.append(match.end())
+        
+        # 添加末尾分割点
+        split_positions.append(len(text))
+        
+        # 寻找最佳分割点
+        for i in range(1, len(split_positions)):
+            prev = split_positions[i-1]
+            curr = split_positions[i]
+            segment = text[prev:curr].strip()
+            if not segment:
+                continue
+            
+            seg_size, measured = counter.measure(segment)
+            if buffer_size + seg_size > max_size:
+                if buffer:
+                    chunks.append(''.join(buffer))
+                    buffer = []
+                    buffer_size = 0
+                if seg_size > max_size:
+                    chunks.extend(counter.split(segment, max_size, measured))
+                else:
+                    buffer.append(segment)
+                    buffer_size += seg_size
+            else:
+                buffer.append(segment)
+                buffer_size += seg_size
+        
+        if buffer:
+            chunks.append(''.join(buffer))
+        
+        return chunks
+
+    def _iter_parents(self, cleaned: str, spans: list[str], sentinel: str, max_size: int = 4000,
+                      counter: ByteCounter | ApproxTokenCounter | None = None) -> Iterator[dict[str, Any]]:
+        """
+        按文档结构生成父子分段，结果只取决于输入文本；结构识别需要扫描全文，父段按顺序逐个产出
+
+        父段边界依次取：## 标记；最浅一级的 Markdown 标题；编号有多级时最浅一级的编号。
+        父段内每个编号条目（连同其后不带编号的续行）为一个子段，其余每行一个子段；
+        单独成行的表格、公式整体作为一个子段，不参与结构识别。
+        父段开头不带编号的短行作为父段标题，没有时取第一个子段的开头；作为边界的标题或编号行
+        过长时只取开头作标题，整行作为第一个子段。标题连同父段头部不超过 max_size 的一半。
+        父段超过 max_size 时按子段拆成多个同标题的父段，超长子段按 _chunk_text 切分。
+
+        :param cleaned: _preprocess_masked 的输出，受保护内容为占位字符
+        :return: 逐个产出 {'parent': 父段标题, 'children': [子段, ...]}
+        """
+        counter = counter or _BYTE_COUNTER
+        rendered = iter(spans)
+        lines = []
+        for line in cleaned.split('\n'):
+            kind, level = _classify_line(line.strip(), sentinel)
+            lines.append((kind, level, _expand(line, sentinel, rendered).strip()))
+
+        # 选择父段边界
+        if any(kind == 'marker' for kind, _, _ in lines):
+            boundary = ('marker', 0)
+        else:
+            heading_levels = {level for kind, level, _ in lines if kind == 'heading'}
+            numbered_levels = {level for kind, level, _ in lines if kind == 'numbered'}
+            if heading_levels:
+                boundary = ('heading', min(heading_levels))
+            elif len(numbered_levels) > 1:
+                boundary = ('numbered', min(numbered_levels))
+            else:
+                boundary = None
+
+        groups = []
+        title = None
+        children = []
+        open_item = False
+        for kind, level, line in lines:
+            if not line:
+                continue
+            if (kind, level) == boundary:
+                if children or title is not None:
+                    groups.append((title, children))
+                children = []
+                open_item = False
+                if kind == 'marker':
+                    title = None
+                    continue
+                title = line.lstrip('#').strip() if kind == 'heading' else line
+                if len(title) > _MAX_TITLE_CHARS:
+                    # 整行编号条目、长标题只取开头作父段标题，完整内容作为第一个子段
+                    children = [title]
+                    title = title[:_MAX_TITLE_CHARS]
+                    open_item = True
+                continue
+            if title is None and not children:
+                if line.startswith(_PARENT_TITLE_PREFIX):
+                    title = _parent_title(line)
+                    continue
+                # 以标题为边界时，第一个标题之前的短行不作为父段标题
+                if kind == 'text' and len(line) <= _MAX_TITLE_LINE_CHARS and boundary in (('marker', 0), None):
+                    title = line
+                    continue
+            if kind == 'text' and open_item and counter.count(children[-1] + line) <= max_size:
+                # 编号条目的续行并入该条目
+                children[-1] += line
+                continue
+            children.append(line)
+            open_item = kind in ('numbered', 'heading')
+        if children or title is not None:
+            groups.append((title, children))
+
+        separator_size = counter.count('\n')
+        for title, children in groups:
+            if not children:
+                if not title:
+                    continue
+                # 只有标题的父段，标题本身作为子段，不丢失内容
+                children = [title]
+            if not title:
+                title = children[0].splitlines()[0][:_MAX_TITLE_CHARS]
+            fitted = _fit_title(title, max_size // 2, counter)
+            if fitted != title and not children[0].startswith(title):
+                # 标题被截短时保留完整标题，不丢失内容
+                children = [title] + children
+            title = fitted
+            header_size = counter.count(render_parent({'parent': title, 'children': []}))
+            # 标题已截到一半上限以内；上限小到空标题的父段头部也超过一半时，子段仍保留一半上限
+            child_limit = max(max_size - header_size - separator_size, max_size // 2 - separator_size, 1)
+            current = []
+            current_size = header_size
+            for child in children:
+                pieces = [child] if counter.count(child) <= child_limit else self._chunk_text(child, child_limit, counter)
+                for piece in pieces:
+                    piece_size = counter.count(piece) + separator_size
+                    if current and current_size + piece_size > max_size:
+                        yield {'parent': title, 'children': current}
+                        current = []
+                        current_size = header_size
+                    current.append(piece)
+                    current_size += piece_size
+            if current:
+                yield {'parent': title, 'children': current}
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        cut_string = tool_parameters.get("CutString", "")
+        token_length = int(tool_parameters.get("Token_Length") or 0)
+        chunk_mode = tool_parameters.get("Chunk_Mode") or "flat"
+        output_mode = tool_parameters.get("Output_Mode") or "json"
+        
+        if token_length > 0:
+            # 按 token 数分块，适配向量、重排模型的 token 上限
+            # 每次调用新建计数器，计数缓存不跨调用保留
+            max_size, counter = min(token_length, 8192), get_token_counter()  # 安全限制
+        else:
+            max_size, counter = min(int(tool_parameters.get("Byte_Length") or 4000), 15000), None  # 安全限制
+        
+        if chunk_mode == "parent_child":
+            # 按标题、编号等结构直接生成父子分段，不再需要大模型插入 ## 和换行
+            parents = self._iter_parents(*self._preprocess_masked(cut_string), max_size, counter)
+            items = ({"chunk": render_parent(parent), **parent} for parent in parents)
+        else:
+            processed = self._preprocess_text(cut_string)
+            items = ({"chunk": chunk} for chunk in self._iter_chunks(processed, max_size, counter))
+        
+        if output_mode == "ndjson":
+            # 每分出一块就输出一行紧凑 JSON，不在内存中保留全部分块
+            for item in items:
+                yield self.create_text_message(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+            return
+        
+        items = list(items)
+        result = {"chunk": [item["chunk"] for item in items]}
+        if chunk_mode == "parent_child":
+            result["parents"] = [{"parent": item["parent"], "children": item["children"]} for item in items]
+        
+        if output_mode == "variable":
+            # 直接输出数组变量（见 cutstring.yaml 的 output_schema），迭代节点不需要再解析 JSON
+            for name, value in result.items():
+                yield self.create_variable_message(name, value)
+            return
+        
+        yield self.create_text_message(json.dumps(
+            result,
+            ensure_ascii=False,
+            indent=2
+        ))
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cutstring'))
+
+try:
+    from tools.cutstring import ApproxTokenCounter, CutstringTool, _BYTE_COUNTER, _classify_line, render_parent
+except Exception as e:  # dify_plugin 未安装或在当前平台无法导入
+    pytest.skip(f"无法导入 cutstring 插件: {e}", allow_module_level=True)
+
+
+def _parents(text, max_size=4000, counter=None):
+    tool = CutstringTool(runtime=None, session=None)
+    return list(tool._iter_parents(*tool._preprocess_masked(text), max_size, counter))
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('1.总则', ('numbered', 1)),
+    ('1、范围', ('numbered', 1)),
+    ('1 范围', ('numbered', 1)),
+    ('2.1开机', ('numbered', 2)),
+    ('"3.3上机前：', ('numbered', 2)),
+    ('1.1 Scope', ('numbered', 2)),
+    ('5个小时后复查设备', ('text', 0)),
+    ('0.5mm钢板', ('text', 0)),
+    ('01.概述', ('text', 0)),
+    ('2.5kg', ('text', 0)),
+    ('2.5 米', ('text', 0)),
+    ('3.5%的用户', ('text', 0)),
+    ('10.5元', ('text', 0)),
+    ('2024年3月', ('text', 0)),
+])
+def test_classify_numbered_lines(line, expected):
+    assert _classify_line(line, '') == expected
+
+
+def test_quantity_line_is_not_a_parent():
+    parents = _parents('5个小时后复查设备\n2.1检查电源\n0.5mm钢板需更换\n1.总则\n1.1范围')
+    assert [parent['parent'] for parent in parents] == ['5个小时后复查设备', '1.总则']
+    assert parents[0]['children'] == ['5个小时后复查设备', '2.1检查电源0.5mm钢板需更换']
+
+
+def test_long_numbered_title_is_capped_and_kept():
+    line = '1.总则：' + '本规定适用于公司所有设备的日常维护与定期检修工作' * 3
+    parents = _parents(line + '\n1.1范围\n2.操作\n2.1开机', 100)
+    first = [parent for parent in parents if parent['parent'].startswith('1.总则')]
+    assert len(first[0]['parent']) <= 20
+    assert ''.join(child for parent in first for child in parent['children']).startswith(line)
+    assert len(parents) < 10
+    assert all(_BYTE_COUNTER.count(render_parent(parent)) <= 100 for parent in parents)
+
+
+def test_small_token_budget_keeps_children_usable():
+    counter = ApproxTokenCounter()
+    text = '1.总则：' + '本规定适用于公司所有设备。' * 4 + '\n1.1范围\n适用于全部设备。\n2.操作\n2.1开机'
+    parents = _parents(text, 16, counter)
+    assert all(counter.count(render_parent(parent)) <= 16 for parent in parents)
+    # 子段上限不会退化到每块只有一个 token
+    assert len(parents) <= counter.count(text) // 4
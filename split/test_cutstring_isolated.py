@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+from conftest import ISOLATED_ENV
+
+SPLIT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_cutstring_plugin_in_separate_process():
+    """在单独的进程中运行 test_cutstring.py，dify_plugin 的 gevent 补丁不影响其他测试"""
+    result = subprocess.run(
+        [sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider', 'test_cutstring.py'],
+        cwd=SPLIT_DIR, env={**os.environ, ISOLATED_ENV: '1'}, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr